@@ -4,6 +4,10 @@ Quarter: Spring 2020
 Author: Chris Linthacum
 """
 
+from array import array
+
+NO_CHILD = 0xFFFF
+
 class HuffmanNode:
     """ Node object for Huffman encoding
         Fields:
@@ -13,6 +17,8 @@ class HuffmanNode:
             right
     """
 
+    __slots__ = ('freq', 'char', 'left', 'right')
+
     def __init__(self, frequency, char=None, left=None, right=None):
         """ Initialization implementation of object"""
 
@@ -55,3 +61,77 @@ class HuffmanNode:
 
         return ord(self.char) < ord(other.char)
 
+
+class FlatHuffmanTree:
+    """ Huffman tree stored as parallel arrays indexed by node id, without
+        an object per node. to_node gives a HuffmanNode view of it.
+        Fields:
+            freqs (array): the frequency of every node
+            chars (array): the ord of the char of every node, the lowest
+                           char of the subtree for internal nodes
+            left (array): the id of the left child, NO_CHILD for leaves
+            right (array): the id of the right child, NO_CHILD for leaves
+            root (int): the id of the root node, NO_CHILD when empty
+    """
+
+    __slots__ = ('freqs', 'chars', 'left', 'right', 'root')
+
+    def __init__(self):
+        """ Initialization implementation of object"""
+
+        self.freqs = array('Q')
+        self.chars = array('H')
+        self.left = array('H')
+        self.right = array('H')
+        self.root = NO_CHILD
+
+    def __len__(self):
+        """ The number of nodes of the tree"""
+
+        return len(self.freqs)
+
+    def add(self, freq, char, left=NO_CHILD, right=NO_CHILD):
+        """ Adds a node, the last one added is the root
+            Args:
+                freq (int): the frequency of the node
+                char (int): the ord of the char of the node
+                left (int): the id of the left child, NO_CHILD for leaves
+                right (int): the id of the right child, NO_CHILD for leaves
+            Returns:
+                int: the id of the new node
+        """
+
+        self.root = len(self.freqs)
+        self.freqs.append(freq)
+        self.chars.append(char)
+        self.left.append(left)
+        self.right.append(right)
+        return self.root
+
+    def is_leaf(self, idx):
+        """ Checks whether a node has no children
+            Args:
+                idx (int): the id of the node
+            Returns:
+                bool: True for leaves
+        """
+
+        return self.left[idx] == NO_CHILD
+
+    def to_node(self, idx=None):
+        """ Builds the HuffmanNode view of a subtree
+            Args:
+                idx (int): the id of the subtree root, None for the root
+            Returns:
+                HuffmanNode: the root of the view, None for an empty tree
+        """
+
+        if idx is None:
+            idx = self.root
+        if idx == NO_CHILD:
+            return None
+        if self.is_leaf(idx):
+            return HuffmanNode(self.freqs[idx], chr(self.chars[idx]))
+        return HuffmanNode(self.freqs[idx], chr(self.chars[idx]),
+                           self.to_node(self.left[idx]),
+                           self.to_node(self.right[idx]))
@@ -0,0 +1,329 @@
+"""Adaptive Huffman Encoding for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+Single pass Huffman coding with the FGK algorithm (Faller, Gallager and
+Knuth). Encoder and decoder start from the same tree holding only the NYT
+(not yet transmitted) leaf and update it identically after every symbol,
+so no frequency pass and no header are needed and every symbol can be
+written as soon as it is read. Layout of the stream:
+
+    magic      4 bytes, b'HUFA'
+    codes      per symbol, the code of its leaf in the current tree, or the
+               code of the NYT leaf followed by the symbol as 9 bits when
+               it occurs for the first time
+
+The NYT code followed by END (256) ends the stream, which is then padded
+with 0s to a whole byte.
+"""
+
+from huffman import HuffmanNode
+from huffman_bit_reader import HuffmanBitReader, read_magic
+from huffman_bit_writer import HuffmanBitWriter
+
+MAGIC = b'HUFA'
+END = 256
+SYMBOL_BITS = 9
+# two nodes per symbol and END, plus the NYT leaf
+MAX_ORDER = 2 * (END + 1)
+CHUNK_SIZE = 1 << 16
+# the tree has at most END + 2 leaves, so a code has at most END + 1 bits,
+# followed by the symbol when it is new
+MAX_SYMBOL_BITS = END + 1 + SYMBOL_BITS
+
+
+class AdaptiveNode(HuffmanNode):
+    """ HuffmanNode of an adaptive tree
+        Fields:
+            parent: the parent node, None for the root
+            order: the position of the node in the sibling order, nodes of
+                   higher order never have a lower freq
+    """
+
+    __slots__ = ('parent', 'order')
+
+    def __init__(self, frequency, char=None, parent=None, order=0):
+        """ Initialization implementation of object"""
+
+        super().__init__(frequency, char)
+        self.parent = parent
+        self.order = order
+
+
+class AdaptiveTree:
+    """ The Huffman tree shared by the encoder and the decoder
+        Attributes:
+            root (AdaptiveNode): the root of the tree
+            nyt (AdaptiveNode): the leaf of the symbols not seen yet
+            leaves (list): the leaf of every symbol, None if not seen yet
+            nodes (list): the nodes indexed by order
+    """
+
+    def __init__(self):
+        """ Starts with the NYT leaf only"""
+
+        self.root = AdaptiveNode(0, order=MAX_ORDER)
+        self.nyt = self.root
+        self.leaves = [None] * (END + 1)
+        self.nodes = [None] * (MAX_ORDER + 1)
+        self.nodes[MAX_ORDER] = self.root
+
+    def code(self, sym):
+        """ Returns the current code of a symbol
+            Args:
+                sym(int): the symbol, 0 to END
+            Returns:
+                tuple: the code and its length, the code of the NYT leaf if
+                       the symbol was not seen yet
+        """
+
+        node = self.leaves[sym] or self.nyt
+        code = 0
+        length = 0
+        while node.parent is not None:
+            if node.parent.right is node:
+                code |= 1 << length
+            length += 1
+            node = node.parent
+        return code, length
+
+    def update(self, sym):
+        """ Counts one more occurrence of a symbol, keeping the sibling
+            property
+            Args:
+                sym(int): the symbol, 0 to END
+        """
+
+        node = self.leaves[sym]
+        if node is None:
+            node = self._split_nyt(sym)
+        nodes = self.nodes
+        while node is not None:
+            # the leader is the node of highest order with the same freq
+            leader = node.order
+            while leader < MAX_ORDER and nodes[leader + 1].freq == node.freq:
+                leader += 1
+            if leader != node.order and nodes[leader] is not node.parent:
+                self._swap(node, nodes[leader])
+            node.freq += 1
+            node = node.parent
+
+    def _split_nyt(self, sym):
+        """ Turns the NYT leaf into a parent of a new NYT leaf and the leaf
+            of a new symbol
+            Args:
+                sym(int): the new symbol
+            Returns:
+                AdaptiveNode: the leaf of the new symbol
+        """
+
+        parent = self.nyt
+        order = parent.order
+        leaf = AdaptiveNode(0, chr(sym), parent, order - 1)
+        self.nyt = AdaptiveNode(0, None, parent, order - 2)
+        parent.left = self.nyt
+        parent.right = leaf
+        self.nodes[order - 1] = leaf
+        self.nodes[order - 2] = self.nyt
+        self.leaves[sym] = leaf
+        return leaf
+
+    def _swap(self, node_1, node_2):
+        """ Exchanges two subtrees of the same freq and their orders"""
+
+        parent_1 = node_1.parent
+        parent_2 = node_2.parent
+        if parent_1 is parent_2:
+            parent_1.left, parent_1.right = parent_1.right, parent_1.left
+        else:
+            if parent_1.left is node_1:
+                parent_1.left = node_2
+            else:
+                parent_1.right = node_2
+            if parent_2.left is node_2:
+                parent_2.left = node_1
+            else:
+                parent_2.right = node_1
+            node_1.parent = parent_2
+            node_2.parent = parent_1
+        self.nodes[node_1.order] = node_2
+        self.nodes[node_2.order] = node_1
+        node_1.order, node_2.order = node_2.order, node_1.order
+
+
+class AdaptiveEncoder:
+    """ Writes an adaptive stream one piece of data at a time
+        Attributes:
+            writer (HuffmanBitWriter): the writer of the stream
+            tree (AdaptiveTree): the tree after the symbols written so far
+    """
+
+    def __init__(self, fname):
+        """ Starts the stream with the magic
+            Args:
+                fname (str): file name, or a binary file object which is
+                             left open by close
+        """
+
+        self.writer = HuffmanBitWriter(fname)
+        self.writer.write_bits(int.from_bytes(MAGIC, 'big'), 8 * len(MAGIC))
+        self.tree = AdaptiveTree()
+
+    def write(self, data):
+        """ Encodes the bytes of data
+            Args:
+                data(bytes-like): the symbols to encode
+        """
+
+        tree = self.tree
+        leaves = tree.leaves
+        writer = self.writer
+        for sym in data:
+            writer.write_bits(*tree.code(sym))
+            if leaves[sym] is None:
+                writer.write_bits(sym, SYMBOL_BITS)
+            tree.update(sym)
+
+    def flush(self):
+        """ Sends every whole byte written so far to the file, so the
+            decoder can catch up with the symbols before the last byte
+        """
+
+        self.writer.flush()
+        if hasattr(self.writer.file, 'flush'):
+            self.writer.file.flush()
+
+    def close(self):
+        """ Ends the stream and closes the writer"""
+
+        self.writer.write_bits(*self.tree.code(END))
+        self.writer.write_bits(END, SYMBOL_BITS)
+        self.writer.close()
+
+
+class AdaptiveDecoder:
+    """ Reads an adaptive stream one piece of data at a time
+        Attributes:
+            reader (HuffmanBitReader): the reader of the stream
+            tree (AdaptiveTree): the tree after the symbols read so far
+            done (bool): whether the end of the stream was read
+    """
+
+    def __init__(self, fname, block_size=CHUNK_SIZE):
+        """ Checks the magic at the start of the stream
+            Args:
+                fname (str): file name, a binary file object which is left
+                             open by close, or a HuffmanBitReader at the
+                             start of the stream
+                block_size (int): the number of bytes read from the file at
+                                  a time, 1 for the lowest latency on
+                                  sockets and pipes
+            Raises:
+                ValueError: if the stream is not adaptive
+        """
+
+        if isinstance(fname, HuffmanBitReader):
+            self.reader = fname
+        else:
+            self.reader = HuffmanBitReader(fname, block_size)
+        self.tree = AdaptiveTree()
+        self.done = False
+        try:
+            magic = self.reader.read_bits(8 * len(MAGIC))
+        except EOFError:
+            magic = None
+        if magic != int.from_bytes(MAGIC, 'big'):
+            self.reader.close()
+            raise ValueError('not an adaptive Huffman stream')
+
+    def read(self, size=-1):
+        """ Decodes up to size symbols
+            Args:
+                size(int): the number of symbols wanted, -1 for all of them
+            Returns:
+                bytes: the symbols, b'' at the end of the stream
+            Raises:
+                ValueError: if the stream ends before its end code
+        """
+
+        tree = self.tree
+        read_bit = self.reader.read_bit
+        out = bytearray()
+        try:
+            while size < 0 or len(out) < size:
+                if self.done:
+                    break
+                node = tree.root
+                while node.left is not None:
+                    node = node.right if read_bit() else node.left
+                if node is tree.nyt:
+                    sym = self.reader.read_bits(SYMBOL_BITS)
+                    if sym == END:
+                        self.done = True
+                        break
+                    if sym > END or tree.leaves[sym] is not None:
+                        raise ValueError('invalid symbol in adaptive stream')
+                else:
+                    sym = ord(node.char)
+                out.append(sym)
+                tree.update(sym)
+        except EOFError:
+            raise ValueError('adaptive stream ended before its end code')
+        return bytes(out)
+
+    def close(self):
+        """ Closes the reader"""
+
+        self.reader.close()
+
+
+def adaptive_encode(in_file, out_file, chunk_size=CHUNK_SIZE):
+    """ Encodes the bytes of a file in a single pass
+        Args:
+            in_file(str): the name of file being read into
+            out_file(str): the name of the compressed file
+            chunk_size(int): the number of bytes read at a time
+        Returns:
+            None
+    """
+
+    encoder = AdaptiveEncoder(out_file)
+    with open(in_file, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            encoder.write(chunk)
+    encoder.close()
+
+
+def iter_adaptive_decode(encoded_file, chunk_size=CHUNK_SIZE):
+    """ Decodes an adaptive file lazily, one piece at a time
+        Args:
+            encoded_file(str): name of the encoded file
+            chunk_size(int): the number of symbols per piece
+        Returns:
+            generator: yields the decoded data as bytes pieces
+    """
+
+    decoder = AdaptiveDecoder(encoded_file)
+    try:
+        while True:
+            data = decoder.read(chunk_size)
+            if not data:
+                return
+            yield data
+    finally:
+        decoder.close()
+
+
+def is_adaptive(encoded_file):
+    """ Checks whether a file is an adaptive stream
+        Args:
+            encoded_file(str): name of the encoded file
+        Returns:
+            bool: True for files of adaptive_encode
+    """
+
+    return read_magic(encoded_file) == MAGIC
@@ -0,0 +1,119 @@
+"""asyncio streams Huffman Encoding for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+Coroutines compressing data from an asyncio.StreamReader into an
+asyncio.StreamWriter. The streams are only read and written on the event
+loop. The coding of each chunk runs in an executor, so the loop keeps
+serving other connections and a slow peer never holds an executor
+thread while it waits. Every chunk written is drained before the next one
+is read, so a slow peer slows the reading down instead of filling memory.
+The writers are left open.
+"""
+
+import asyncio
+import io
+import tempfile
+
+from huffman_adaptive import AdaptiveEncoder
+from huffman_coding import CHUNK_SIZE
+from huffman_memory import encode_fileobj, StreamDecoder
+from huffman_table import DEFAULT_TABLE_BITS
+
+# inputs and outputs of two pass encodes are kept in memory up to this size
+SPOOL_SIZE = 1 << 24
+
+
+async def encode_stream(reader, writer, chunk_size=CHUNK_SIZE,
+                        single_pass=True, executor=None):
+    """ Encodes the data of a stream until its end
+        Args:
+            reader(asyncio.StreamReader): the stream being read from
+            writer(asyncio.StreamWriter): the stream the compressed data is
+                                          written to
+            chunk_size(int): the number of bytes read at a time
+            single_pass(bool): write the adaptive format as the data comes
+                               in, otherwise keep the input until its end
+                               and write the canonical format
+            executor(Executor): runs the coding, None for the default one
+        Returns:
+            None
+    """
+
+    loop = asyncio.get_running_loop()
+    if not single_pass:
+        with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as spool, \
+                tempfile.SpooledTemporaryFile(SPOOL_SIZE) as out:
+            while True:
+                chunk = await reader.read(chunk_size)
+                if not chunk:
+                    break
+                spool.write(chunk)
+            spool.seek(0)
+            await loop.run_in_executor(executor, encode_fileobj, spool, out,
+                                       chunk_size)
+            out.seek(0)
+            while True:
+                chunk = out.read(chunk_size)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+        return
+
+    sink = io.BytesIO()
+    encoder = AdaptiveEncoder(sink)
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        await loop.run_in_executor(executor, encoder.write, chunk)
+        encoder.flush()
+        await _send(writer, sink)
+    encoder.close()
+    await _send(writer, sink)
+
+
+async def decode_stream(reader, writer, chunk_size=CHUNK_SIZE,
+                        table_bits=DEFAULT_TABLE_BITS, executor=None):
+    """ Decodes compressed data of a stream, in the canonical, adaptive,
+        stored or text header format
+        Args:
+            reader(asyncio.StreamReader): the stream being read from
+            writer(asyncio.StreamWriter): the stream the decoded data is
+                                          written to
+            chunk_size(int): the number of bytes read at a time
+            table_bits(int): the number of bits resolved per table lookup
+            executor(Executor): runs the coding, None for the default one
+        Returns:
+            int: the number of decoded bytes
+        Raises:
+            ValueError: if the header is invalid or the data is truncated
+    """
+
+    loop = asyncio.get_running_loop()
+    decoder = StreamDecoder(table_bits)
+    size = 0
+    while True:
+        chunk = await reader.read(chunk_size)
+        if chunk:
+            data = await loop.run_in_executor(executor, decoder.feed, chunk)
+        else:
+            data = await loop.run_in_executor(executor, decoder.finish)
+        if data:
+            writer.write(data)
+            await writer.drain()
+            size += len(data)
+        if not chunk:
+            return size
+
+
+async def _send(writer, sink):
+    """ Writes out and empties the bytes of a BytesIO, then drains"""
+
+    if sink.tell():
+        writer.write(sink.getvalue())
+        sink.seek(0)
+        sink.truncate()
+        await writer.drain()
@@ -0,0 +1,501 @@
+"""Benchmarks for the Huffman Encoding of Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+Run with: python huffman_bench.py [size] [benchmark ...] [options]
+
+The size takes K, M and G suffixes. Every result is a record of the
+benchmark, case, corpus profile and size, best and median time, units
+processed and calls made. Stages too slow or too large for big corpora
+run on a sample of SAMPLE_SIZE characters, their records giving the
+size of the sample. --json appends the records to a file as JSON
+lines, and --compare checks them against such a file of an earlier run,
+failing when a case got slower than --tolerance allows.
+"""
+
+import argparse
+import heapq
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from huffman_coding import huffman_encode
+from huffman_coding import huffman_decode
+from huffman_coding import cnt_freq
+from huffman_coding import create_code
+from huffman_coding import encode_text
+from huffman_coding import create_huff_tree
+from huffman_coding import create_huff_tree_linear
+from huffman_bit_writer import HuffmanBitWriter
+from huffman_parallel import huffman_encode_parallel
+from huffman_parallel import huffman_decode_parallel
+from min_pq import MinPQ
+
+
+PROFILES = ('uniform', 'skewed', 'single')
+CORPUS_BLOCK = 1 << 20
+SIZE_SUFFIXES = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+# encode_text builds the whole '0'/'1' string and write_code runs at about
+# 1 MB/s, so they are timed on at most this many characters
+SAMPLE_SIZE = 1 << 20
+
+
+def make_corpus(filename, size, seed=202, profile='skewed'):
+    """ Writes a text file of synthetic characters, a block at a time so
+        corpora larger than memory can be made
+        Args:
+            filename(str): the name of the file to be written
+            size(int): the number of characters to write
+            seed(int): the seed of the random generator
+            profile(str): the entropy of the text, 'uniform' over printable
+                          ASCII, 'skewed' English-like or 'single' for one
+                          repeated character
+    """
+
+    rand = random.Random(seed)
+    letters = 'etaoinshrdlucmfwypvbgkjqxz'
+    if profile == 'uniform':
+        alphabet = '\n' + ''.join(map(chr, range(32, 127)))
+        weights = None
+    elif profile == 'skewed':
+        alphabet = ' \n' + letters + letters.upper() + '.,;:!?0123456789'
+        weights = [1.0 / (rank + 1) for rank in range(len(alphabet))]
+    elif profile == 'single':
+        alphabet = 'a'
+        weights = None
+    else:
+        raise ValueError('unknown corpus profile {!r}'.format(profile))
+    with open(filename, 'w') as file:
+        for start in range(0, size, CORPUS_BLOCK):
+            count = min(CORPUS_BLOCK, size - start)
+            file.write(''.join(rand.choices(alphabet, weights, k=count)))
+
+
+def best_time(func, repeat=3):
+    """ Runs func repeat times and returns the fastest wall time
+        Args:
+            func(callable): the function to be timed
+            repeat(int): the number of runs
+        Returns:
+            float: the fastest run in seconds
+    """
+
+    return min(run_times(func, repeat))
+
+
+def run_times(func, repeat=3):
+    """ Runs func repeat times
+        Args:
+            func(callable): the function to be timed
+            repeat(int): the number of runs
+        Returns:
+            list: the wall time of every run in seconds
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_record(bench, case, times, units, unit, calls=1, profile=None,
+                size=None, sample=None):
+    """ Builds the result record of one case
+        Args:
+            bench(str): the name of the benchmark
+            case(str): the name of the case
+            times(list): the wall time of every run in seconds
+            units(int): the number of units processed per run
+            unit(str): the unit, e.g. 'B' for bytes
+            calls(int): the number of calls timed per run
+            profile(str): the corpus profile, None if no corpus is used
+            size(int): the corpus size
+            sample(int): the number of characters of the sample the case ran
+                         on, None if it ran on the whole corpus
+        Returns:
+            dict: the record
+    """
+
+    best = min(times)
+    return {'bench': bench, 'case': case, 'profile': profile, 'size': size,
+            'sample': sample, 'best': best, 'median': statistics.median(times),
+            'units': units, 'unit': unit, 'calls': calls,
+            'throughput': units / best if best else float('inf'),
+            'latency': best / calls,
+            'python': platform.python_version(),
+            'machine': platform.machine()}
+
+
+def bench_stages(size, profile='skewed', repeat=3, n_calls=100):
+    """ Times every stage of the pipeline on its own
+        Args:
+            size(int): the number of characters of the corpus
+            profile(str): the entropy of the corpus, one of PROFILES
+            repeat(int): the number of runs per stage
+            n_calls(int): the number of calls per run of the stages that do
+                          not depend on the corpus size
+        Returns:
+            list: a record per stage, the stages run on a sample of
+                  SAMPLE_SIZE characters when size is larger
+    """
+
+    records = []
+
+    def add(case, func, units, unit, calls=1, sample=None):
+        records.append(make_record('stages', case, run_times(func, repeat),
+                                   units, unit, calls, profile, size,
+                                   sample))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text = os.path.join(tmp, 'corpus.txt')
+        encoded = os.path.join(tmp, 'corpus_enc.txt')
+        compressed = os.path.join(tmp, 'corpus_enc_compressed.txt')
+        decoded = os.path.join(tmp, 'corpus_dec.txt')
+        make_corpus(text, size, profile=profile)
+        freq_list = cnt_freq(text)
+        tree = create_huff_tree(freq_list)
+        codes = create_code(tree)
+        sample = None
+        sample_text = text
+        sample_size = size
+        if size > SAMPLE_SIZE:
+            sample = sample_size = SAMPLE_SIZE
+            sample_text = os.path.join(tmp, 'sample.txt')
+            with open(text) as file, open(sample_text, 'w') as out:
+                out.write(file.read(SAMPLE_SIZE))
+
+        def repeated(func, *args):
+            return lambda: [func(*args) for _ in range(n_calls)]
+
+        def write_code():
+            writer = HuffmanBitWriter(io.BytesIO())
+            for chunk in _read_text(sample_text):
+                for char in chunk:
+                    writer.write_code(codes[ord(char)])
+            writer.close()
+
+        add('cnt_freq', lambda: cnt_freq(text), size, 'B')
+        add('create_huff_tree', repeated(create_huff_tree, freq_list),
+            n_calls, 'tree', n_calls)
+        add('create_code', repeated(create_code, tree), n_calls, 'table',
+            n_calls)
+        add('encode_text', lambda: encode_text(sample_text, codes),
+            sample_size, 'B', sample=sample)
+        add('write_code', write_code, sample_size, 'B', sample_size, sample)
+        add('huffman_encode', lambda: huffman_encode(text, encoded, False),
+            size, 'B')
+        add('huffman_decode', lambda: huffman_decode(compressed, decoded),
+            size, 'B')
+
+    n_items = max(size // 16, 1)
+    rand = random.Random(202)
+    items = [rand.random() for _ in range(n_items)]
+
+    def minpq_insert_del_min():
+        queue = MinPQ()
+        for item in items:
+            queue.insert(item)
+        while not queue.is_empty():
+            queue.del_min()
+
+    add('minpq_insert_del_min', minpq_insert_del_min, 2 * n_items, 'op',
+        2 * n_items)
+    return records
+
+
+def _read_text(filename):
+    """ Yields the characters of a text file in pieces"""
+
+    with open(filename) as file:
+        while True:
+            chunk = file.read(CORPUS_BLOCK)
+            if not chunk:
+                return
+            yield chunk
+
+
+def bench_decode(size, repeat=3, profile='skewed'):
+    """ Compares the tree walk decoder against the table decoder
+        Args:
+            size(int): the number of characters of the corpus
+            repeat(int): the number of runs per decoder
+            profile(str): the entropy of the corpus, one of PROFILES
+        Returns:
+            dict: decoder name -> best time in seconds
+    """
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        text = os.path.join(tmp, 'corpus.txt')
+        encoded = os.path.join(tmp, 'corpus_enc.txt')
+        compressed = os.path.join(tmp, 'corpus_enc_compressed.txt')
+        decoded = os.path.join(tmp, 'corpus_dec.txt')
+        make_corpus(text, size, profile=profile)
+        huffman_encode(text, encoded)
+        for name, bits in (('tree', 0), ('table8', 8), ('table12', 12)):
+            results[name] = best_time(
+                lambda bits=bits: huffman_decode(compressed, decoded, bits),
+                repeat)
+    return results
+
+
+def bench_parallel(size, repeat=3, block_size=1 << 18, profile='skewed'):
+    """ Times the block-parallel encoder and decoder per worker count
+        Args:
+            size(int): the number of characters of the corpus
+            repeat(int): the number of runs per worker count
+            block_size(int): the number of bytes per block
+            profile(str): the entropy of the corpus, one of PROFILES
+        Returns:
+            dict: stage and worker count -> best time in seconds
+    """
+
+    results = {}
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory() as tmp:
+        text = os.path.join(tmp, 'corpus.txt')
+        encoded = os.path.join(tmp, 'corpus.huf')
+        decoded = os.path.join(tmp, 'corpus_dec.txt')
+        make_corpus(text, size, profile=profile)
+        for workers in counts:
+            results['encode x{}'.format(workers)] = best_time(
+                lambda: huffman_encode_parallel(text, encoded, block_size,
+                                                workers), repeat)
+        for workers in counts:
+            results['decode x{}'.format(workers)] = best_time(
+                lambda: huffman_decode_parallel(encoded, decoded, workers),
+                repeat)
+    return results
+
+
+def bench_minpq(n_items, repeat=3):
+    """ Compares MinPQ against heapq on the same operations
+        Args:
+            n_items(int): the number of items pushed and popped
+            repeat(int): the number of runs per case
+        Returns:
+            dict: case -> best time in seconds
+    """
+
+    rand = random.Random(202)
+    items = [rand.random() for _ in range(n_items)]
+
+    def minpq_push_pop():
+        queue = MinPQ()
+        for item in items:
+            queue.insert(item)
+        while not queue.is_empty():
+            queue.del_min()
+
+    def heapq_push_pop():
+        heap = []
+        for item in items:
+            heapq.heappush(heap, item)
+        while heap:
+            heapq.heappop(heap)
+
+    def minpq_pushpop():
+        queue = MinPQ(items[:64])
+        for item in items:
+            queue.pushpop(item)
+
+    def heapq_pushpop():
+        heap = items[:64]
+        heapq.heapify(heap)
+        for item in items:
+            heapq.heappushpop(heap, item)
+
+    def minpq_extend():
+        MinPQ().extend(items)
+
+    def heapq_heapify():
+        heapq.heapify(list(items))
+
+    results = {}
+    for func in (minpq_push_pop, heapq_push_pop, minpq_pushpop,
+                 heapq_pushpop, minpq_extend, heapq_heapify):
+        results[func.__name__] = best_time(func, repeat)
+    return results
+
+
+def bench_tree(n_trees, repeat=3):
+    """ Compares the MinPQ and the two-queue tree builders
+        Args:
+            n_trees(int): the number of trees built per case
+            repeat(int): the number of runs per case
+        Returns:
+            dict: builder name -> best time in seconds
+    """
+
+    rand = random.Random(202)
+    histograms = [[rand.randint(0, 1000) for _ in range(256)]
+                  for _ in range(16)]
+
+    def build(builder):
+        for idx in range(n_trees):
+            builder(histograms[idx % len(histograms)])
+
+    return {
+        'minpq': best_time(lambda: build(create_huff_tree), repeat),
+        'two_queue': best_time(lambda: build(create_huff_tree_linear),
+                               repeat),
+    }
+
+
+# name -> (benchmark, number of units processed for a given size, unit,
+#          whether it runs on a corpus of each profile)
+BENCHMARKS = {
+    'stages': (bench_stages, None, None, True),
+    'decode': (lambda size, profile, repeat: bench_decode(size, repeat,
+                                                          profile),
+               lambda size: size, 'B', True),
+    'parallel': (lambda size, profile, repeat: bench_parallel(
+        size, repeat, profile=profile), lambda size: size, 'B', True),
+    'minpq': (lambda size, profile, repeat: bench_minpq(size // 16, repeat),
+              lambda size: size // 16, 'op', False),
+    'tree': (lambda size, profile, repeat: bench_tree(size // 8192, repeat),
+             lambda size: size // 8192, 'tree', False),
+}
+
+
+def run_benchmark(name, size, profile, repeat=3):
+    """ Runs one benchmark
+        Args:
+            name(str): the name of the benchmark in BENCHMARKS
+            size(int): the corpus size
+            profile(str): the corpus profile, ignored by benchmarks without
+                          a corpus
+            repeat(int): the number of runs per case
+        Returns:
+            list: a record per case
+    """
+
+    bench, units, unit, uses_profile = BENCHMARKS[name]
+    if not uses_profile:
+        profile = None
+    results = bench(size, profile, repeat)
+    if units is None:
+        return results
+    # benchmarks comparing variants only keep the best time of each
+    return [make_record(name, case, [seconds], units(size), unit,
+                        profile=profile, size=size)
+            for case, seconds in results.items()]
+
+
+def parse_size(text):
+    """ Parses a size with an optional K, M or G suffix
+        Args:
+            text(str): e.g. '4096', '64K' or '1G'
+        Returns:
+            int: the size in bytes
+    """
+
+    text = text.strip().upper()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def compare(records, baseline, tolerance):
+    """ Matches records with those of an earlier run
+        Args:
+            records(list): the records of this run
+            baseline(list): the records of the earlier run
+            tolerance(float): the slowdown allowed, 0.1 for 10%
+        Returns:
+            list: (record, speedup, regressed) for every record of this run
+                  that the earlier run has, speedup > 1 means faster now
+    """
+
+    def key(record):
+        return (record['bench'], record['case'], record['profile'],
+                record['size'])
+
+    earlier = {key(record): record for record in baseline}
+    out = []
+    for record in records:
+        if key(record) in earlier:
+            speedup = earlier[key(record)]['best'] / record['best']
+            out.append((record, speedup, speedup < 1 / (1 + tolerance)))
+    return out
+
+
+def main(argv):
+    """ Runs the benchmarks and prints the results
+        Args:
+            argv(list): command line arguments, an optional corpus size, the
+                        names of the benchmarks to run and options
+        Returns:
+            int: the exit status, 1 if a case regressed against --compare
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='huffman_bench.py',
+        description='Benchmarks of the Huffman coding pipeline')
+    parser.add_argument('size', nargs='?', default='1M', type=parse_size,
+                        help='corpus size, e.g. 64K, 16M or 1G')
+    parser.add_argument('names', nargs='*', metavar='benchmark',
+                        help='any of ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--profile', action='append', choices=PROFILES,
+                        help='corpus entropy, may be repeated, default '
+                             'skewed')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per case')
+    parser.add_argument('--json', metavar='FILE',
+                        help='append the records to FILE as JSON lines')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='JSON lines of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='slowdown allowed by --compare, default 0.1')
+    args = parser.parse_args(argv[1:])
+    names = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark {!r}'.format(name))
+
+    records = []
+    for name in names:
+        profiles = args.profile or ['skewed']
+        if not BENCHMARKS[name][3]:
+            profiles = profiles[:1]
+        for profile in profiles:
+            for record in run_benchmark(name, args.size, profile,
+                                        args.repeat):
+                records.append(record)
+                print('{:8} {:22} {:8} {:9.4f}s {:12.0f} {:>5}/s '
+                      '{:10.3g}s/call'.format(
+                          record['bench'], record['case'],
+                          record['profile'] or '-', record['best'],
+                          record['throughput'], record['unit'],
+                          record['latency']))
+
+    if args.json:
+        with open(args.json, 'a') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = [json.loads(line) for line in file if line.strip()]
+        regressed = False
+        for record, speedup, slower in compare(records, baseline,
+                                               args.tolerance):
+            print('{:8} {:22} {:8} {:6.2f}x{}'.format(
+                record['bench'], record['case'], record['profile'] or '-',
+                speedup, '  REGRESSION' if slower else ''))
+            regressed = regressed or slower
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
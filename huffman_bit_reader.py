@@ -1,59 +1,201 @@
-"""Bit-packing reader and writer for Huffman encoder and decoder
-"""
-
-import struct
-
-class HuffmanBitReader:
-    """HuffmanBitReader is a HuffmanBitReader(string)
-    Attributes:
-        file (file): a file object
-        n_bits (int): the number of bits
-        byte (int): the current byte
-        mask (int): bit mask
-    """
-    def __init__(self, fname):
-        """open a file with file name 'fname' for reading in binary mode
-        Args:
-            fname (str): file name
-        """
-        self.file = open(fname, 'rb')
-        self.n_bits = 0
-        self.byte = 0
-        self.mask = 0
-
-    def close(self):
-        """closes opened file"""
-        self.file.close()
-
-    def read_str(self): # str is a string
-        """ Use this method to read the header from the compressed file.
-        Returns:
-            str: the header line
-        """
-        return self.file.readline()
-
-    def read_bit(self):
-        """ reads bit.
-        Use this method to read a single bit from opened file
-        Returns:
-            bool: False if a 0 was read, 1 otherwise
-        Raises:
-            Error: if the end of file is reached
-        """
-        if self.mask == 0:   # all bits consumed, need to read in the next byte
-            self.byte = self.read_byte()
-            self.mask = 1 << 7
-        bit = self.byte & self.mask
-        self.mask = self.mask >> 1
-        if bit == 0:
-            return False
-        return True
-
-    def read_byte(self):
-        """Reads a 1 byte from opened file and returns as unsigned int
-        You should not need to call this method
-
-        Returns:
-            int: 1 byte unsigned int
-        """
-        return struct.unpack('B', self.file.read(1))[0]  # 1 byte unsigned int
+"""Bit-packing reader and writer for Huffman encoder and decoder
+"""
+
+BLOCK_SIZE = 1 << 16
+MAGIC_SIZE = 4
+
+def read_magic(fname):
+    """ Reads the magic that starts the binary formats of the encoders
+    Args:
+        fname (str): name of the encoded file
+    Returns:
+        bytes: the first MAGIC_SIZE bytes of the file, fewer if it is
+               shorter
+    """
+    with open(fname, 'rb') as file:
+        return file.read(MAGIC_SIZE)
+
+class HuffmanBitReader:
+    """HuffmanBitReader is a HuffmanBitReader(string)
+    Attributes:
+        file (file): a file object
+        owns_file (bool): whether close also closes file
+        block_size (int): the number of bytes read from file at a time
+        buffer (bytes): the block of the file being consumed
+        pos (int): the position of the next unconsumed byte in buffer
+        acc (int): bit accumulator, its low n_bits bits are unconsumed
+        n_bits (int): the number of bits held in acc
+        n_reads (int): the number of blocks read from file so far
+    """
+    def __init__(self, fname, block_size=BLOCK_SIZE):
+        """open a file with file name 'fname' for reading in binary mode
+        Args:
+            fname (str): file name, or a binary file object which is left
+                         open by close
+            block_size (int): the number of bytes read from file at a time
+        """
+        self.owns_file = not hasattr(fname, 'read')
+        if self.owns_file:
+            self.file = open(fname, 'rb')
+        else:
+            self.file = fname
+        self.block_size = block_size
+        self.buffer = b''
+        self.pos = 0
+        self.acc = 0
+        self.n_bits = 0
+        self.n_reads = 0
+
+    def close(self):
+        """closes opened file"""
+        if self.owns_file:
+            self.file.close()
+
+    def tell(self):
+        """ Returns the position in the file of the next unconsumed byte.
+        The reader must be byte aligned.
+        Returns:
+            int: the byte offset
+        """
+        if self.n_bits % 8:
+            raise ValueError('reader is not at a byte boundary')
+        return self.file.tell() - (len(self.buffer) - self.pos) \
+            - self.n_bits // 8
+
+    def read_str(self): # str is a string
+        """ Use this method to read the header from the compressed file.
+        Returns:
+            str: the header line
+        """
+        self._unload()
+        line = b''
+        while True:
+            end = self.buffer.find(b'\n', self.pos)
+            if end >= 0:
+                line += self.buffer[self.pos:end + 1]
+                self.pos = end + 1
+                return line
+            line += self.buffer[self.pos:]
+            if not self._read_block():
+                return line
+
+    def read_bit(self):
+        """ reads bit.
+        Use this method to read a single bit from opened file
+        Returns:
+            bool: False if a 0 was read, 1 otherwise
+        Raises:
+            EOFError: if the end of file is reached
+        """
+        if self.n_bits == 0 and not self._fill(1):
+            raise EOFError('no bits left to read')
+        self.n_bits -= 1
+        return (self.acc >> self.n_bits) & 1 == 1
+
+    def read_byte(self):
+        """Reads 8 bits from opened file and returns them as unsigned int
+        You should not need to call this method
+
+        Returns:
+            int: 1 byte unsigned int
+        """
+        return self.read_bits(8)
+
+    def peek_bits(self, n):
+        """ Returns the next n bits without consuming them. Past the end of
+        the file the missing bits read as 0s.
+        Args:
+            n (int): the number of bits
+        Returns:
+            int: the bits as unsigned int, the first bit is the highest
+        """
+        if self.n_bits < n and not self._fill(n):
+            return (self.acc & ((1 << self.n_bits) - 1)) << (n - self.n_bits)
+        return (self.acc >> (self.n_bits - n)) & ((1 << n) - 1)
+
+    def skip_bits(self, n):
+        """ Consumes the next n bits
+        Args:
+            n (int): the number of bits
+        Raises:
+            EOFError: if fewer than n bits are left
+        """
+        if self.n_bits < n and not self._fill(n):
+            raise EOFError('no bits left to skip')
+        self.n_bits -= n
+
+    def read_bits(self, n):
+        """ Reads the next n bits
+        Args:
+            n (int): the number of bits
+        Returns:
+            int: the bits as unsigned int, the first bit is the highest
+        Raises:
+            EOFError: if fewer than n bits are left
+        """
+        if self.n_bits < n and not self._fill(n):
+            raise EOFError('no bits left to read')
+        self.n_bits -= n
+        return (self.acc >> self.n_bits) & ((1 << n) - 1)
+
+    def align(self):
+        """ Skips the bits left before the next byte boundary"""
+        self.n_bits -= self.n_bits % 8
+
+    def iter_bytes(self):
+        """ Yields the rest of the file as blocks of bytes, for decoders
+        doing their own bit extraction. The reader must be byte aligned.
+        Yields:
+            bytes: the next block of the file
+        """
+        self._unload()
+        if self.pos < len(self.buffer):
+            block = self.buffer[self.pos:]
+            self.pos = len(self.buffer)
+            yield block
+        while self._read_block():
+            self.pos = len(self.buffer)
+            yield self.buffer
+
+    def _read_block(self):
+        """ Replaces the buffer with the next block of the file
+        Returns:
+            bool: False if the end of file is reached
+        """
+        self.buffer = self.file.read(self.block_size)
+        self.pos = 0
+        self.n_reads += 1
+        return len(self.buffer) > 0
+
+    def _fill(self, n):
+        """ Moves bytes from the buffer into the accumulator, up to 64 bits
+        at a time, until it holds at least n bits
+        Args:
+            n (int): the number of bits needed
+        Returns:
+            bool: False if the end of file is reached first
+        """
+        while self.n_bits < n:
+            if self.pos >= len(self.buffer) and not self._read_block():
+                return False
+            take = max(1, (64 - self.n_bits) // 8)
+            block = self.buffer[self.pos:self.pos + take]
+            self.pos += len(block)
+            self.acc = ((self.acc & ((1 << self.n_bits) - 1))
+                        << (8 * len(block))) | int.from_bytes(block, 'big')
+            self.n_bits += 8 * len(block)
+        return True
+
+    def _unload(self):
+        """ Returns the whole bytes held by the accumulator to the buffer
+        Raises:
+            ValueError: if the reader is not at a byte boundary
+        """
+        if self.n_bits % 8:
+            raise ValueError('reader is not at a byte boundary')
+        if self.n_bits:
+            held = (self.acc & ((1 << self.n_bits) - 1)).to_bytes(
+                self.n_bits // 8, 'big')
+            self.buffer = held + self.buffer[self.pos:]
+            self.pos = 0
+            self.n_bits = 0
@@ -1,57 +1,163 @@
-"""Huffman bit writer module
-"""
-
-import struct
-
-class HuffmanBitWriter:
-    """Bit-packing writer for Huffman encoder
-
-    Attributes:
-        file (file): a file object
-        n_bits (int): the number of bits
-        byte (int): a byte as int
-    """
-    def __init__(self, fname):
-        """open a file with file name 'fname' for writing in binary mode
-        Args:
-            fname (str): a file name of the output file
-        """
-        self.file = open(fname, 'wb') # open a file with file name fname
-        self.n_bits = 0               # Number of accumulated bits so far
-        self.byte = 0                 # accumulated bits represented as byte
-
-    def close(self):
-        """ Closes the compressed file.
-        Use this method to close the compressed file.
-        """
-        # need to pad remaining bits in byte with 0s and write them to file
-        if self.n_bits > 0:
-            self.byte = self.byte << (7-self.n_bits)
-            self.file.write(struct.pack('B', self.byte))
-        self.file.close()
-
-    def write_str(self, string):
-        """Writes a string as a text in the file.
-        Use this method to write the header to the compressed file.
-
-        Args:
-            string (str): a string
-        """
-        self.file.write(string.encode('utf-8'))
-
-    def write_code(self, code):
-        """Write code as bits
-        Use this method to write individual 0 and 1 bits to the compressed file
-        Args:
-            code (str): a string of '0's and '1's
-        """
-        for bit in code:
-            if bit == '1':
-                self.byte += 1
-            if self.n_bits == 7:
-                self.file.write(struct.pack('B', self.byte))
-                self.byte = 0
-                self.n_bits = 0
-            else:
-                self.byte = self.byte << 1
-                self.n_bits += 1
+"""Huffman bit writer module
+"""
+
+from huffman_pack import code_arrays, pack_codes, MIN_SYMBOLS
+
+FLUSH_SIZE = 1 << 16
+
+class HuffmanBitWriter:
+    """Bit-packing writer for Huffman encoder
+
+    Attributes:
+        file (file): a file object
+        owns_file (bool): whether close also closes file
+        n_bits (int): the number of bits
+        acc (int): accumulated bits, its low n_bits bits are pending
+        buffer (bytearray): packed bytes waiting to be written to file
+        flush_size (int): the buffer size that triggers a write to file
+        n_flushes (int): the number of buffer writes to file so far
+        vectorize (bool): whether write_codes may pack large blocks with
+                          NumPy
+    """
+    def __init__(self, fname, flush_size=FLUSH_SIZE, vectorize=True):
+        """open a file with file name 'fname' for writing in binary mode
+        Args:
+            fname (str): a file name of the output file, or a binary file
+                         object which is left open by close
+            flush_size (int): the buffer size that triggers a write to file
+            vectorize (bool): let write_codes pack large blocks with NumPy
+                              when it is installed, the output is the same
+        """
+        self.owns_file = not hasattr(fname, 'write')
+        if self.owns_file:
+            self.file = open(fname, 'wb') # open a file with file name fname
+        else:
+            self.file = fname
+        self.n_bits = 0               # Number of accumulated bits so far
+        self.acc = 0                  # accumulated bits represented as int
+        self.buffer = bytearray()     # packed bytes not yet written
+        self.flush_size = flush_size
+        self.n_flushes = 0
+        self.vectorize = vectorize
+        self._arrays = (None, None)   # last code table and its arrays
+
+    def close(self):
+        """ Closes the compressed file.
+        Use this method to close the compressed file.
+        """
+        # need to pad remaining bits in byte with 0s and write them to file
+        self._pack()
+        if self.n_bits > 0:
+            self.buffer.append((self.acc << (8 - self.n_bits)) & 0xFF)
+            self.acc = 0
+            self.n_bits = 0
+        self.flush()
+        if self.owns_file:
+            self.file.close()
+
+    def flush(self):
+        """ Writes the whole bytes written so far to the file, the bits of
+        an unfinished byte stay pending"""
+        self._pack()
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+            self.n_flushes += 1
+
+    def tell_bits(self):
+        """ Returns the position of the next bit written in the file
+        Returns:
+            int: the number of bits before it
+        """
+        return 8 * (self.file.tell() + len(self.buffer)) + self.n_bits
+
+    def write_str(self, string):
+        """Writes a string as a text in the file.
+        Use this method to write the header to the compressed file.
+
+        Args:
+            string (str): a string
+        Raises:
+            ValueError: if the bits written so far do not fill whole bytes
+        """
+        self._pack()
+        if self.n_bits:
+            raise ValueError('string does not start at a byte boundary')
+        self.buffer += string.encode('utf-8')
+
+    def write_code(self, code):
+        """Write code as bits
+        Use this method to write individual 0 and 1 bits to the compressed file
+        Args:
+            code (str): a string of '0's and '1's
+        """
+        if code:
+            self.write_bits(int(code, 2), len(code))
+
+    def write_bits(self, code, length):
+        """Write the low length bits of code, highest bit first
+        Args:
+            code (int): the code as an integer
+            length (int): the number of bits of the code
+        """
+        self.acc = (self.acc << length) | code
+        self.n_bits += length
+        if self.n_bits >= 64:
+            self._pack()
+
+    def write_codes(self, symbols, codes):
+        """Write the code of every symbol
+        Use this method to encode whole blocks of input at once, large
+        blocks of bytes are packed with NumPy when it is installed
+        Args:
+            symbols (iterable): symbols as ints, e.g. a bytes object
+            codes (list): (code, length) pairs indexed by symbol as built by
+                          create_code with as_int=True
+        """
+        if (self.vectorize and isinstance(symbols, (bytes, bytearray,
+                                                    memoryview))
+                and len(symbols) >= MIN_SYMBOLS):
+            arrays = self._code_arrays(codes)
+            if arrays is not None:
+                self._pack()
+                data, self.acc, self.n_bits = pack_codes(
+                    symbols, arrays, self.acc, self.n_bits)
+                self.buffer += data
+                if len(self.buffer) >= self.flush_size:
+                    self.flush()
+                return
+        acc = self.acc
+        n_bits = self.n_bits
+        buffer = self.buffer
+        flush_size = self.flush_size
+        for sym in symbols:
+            code, length = codes[sym]
+            acc = (acc << length) | code
+            n_bits += length
+            if n_bits >= 64:
+                n_bits -= 64
+                buffer += (acc >> n_bits).to_bytes(8, 'big')
+                acc &= (1 << n_bits) - 1
+                if len(buffer) >= flush_size:
+                    self.file.write(buffer)
+                    buffer.clear()
+                    self.n_flushes += 1
+        self.acc = acc
+        self.n_bits = n_bits
+
+    def _code_arrays(self, codes):
+        """ Returns the NumPy lookup arrays of codes, None if they cannot be
+        used, reusing those of the last table"""
+        if self._arrays[0] is not codes:
+            self._arrays = (codes, code_arrays(codes))
+        return self._arrays[1]
+
+    def _pack(self):
+        """ Moves the whole bytes of the accumulator into the buffer"""
+        n_bytes = self.n_bits // 8
+        if n_bytes:
+            self.n_bits -= 8 * n_bytes
+            self.buffer += (self.acc >> self.n_bits).to_bytes(n_bytes, 'big')
+            self.acc &= (1 << self.n_bits) - 1
+            if len(self.buffer) >= self.flush_size:
+                self.flush()
@@ -0,0 +1,82 @@
+"""Bounded LRU cache for Huffman code tables of Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+"""
+
+import threading
+from collections import OrderedDict
+
+DEFAULT_SIZE = 32
+
+
+class LRUCache:
+    """ Mapping of a bounded number of values, evicting the least recently
+        used one when full
+        Attributes:
+            maxsize (int): the number of values kept, 0 disables caching
+            hits (int): the number of lookups that found their value
+            misses (int): the number of lookups that built their value
+            evictions (int): the number of values dropped to make room
+    """
+
+    def __init__(self, maxsize=DEFAULT_SIZE):
+        """ Initialization implementation of object"""
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """ The number of values held"""
+
+        return len(self._values)
+
+    def get(self, key, build):
+        """ Returns the value of key, building and storing it on a miss
+            Args:
+                key(hashable): the key of the value
+                build(callable): returns the value, called without arguments
+            Returns:
+                object: the cached or newly built value
+        """
+
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key]
+            self.misses += 1
+
+        value = build()
+        with self._lock:
+            if self.maxsize > 0:
+                self._values[key] = value
+                self._values.move_to_end(key)
+                while len(self._values) > self.maxsize:
+                    self._values.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        """ Drops every value and resets the counters"""
+
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """ Returns the counters
+            Returns:
+                dict: hits, misses, evictions, size and maxsize
+        """
+
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'size': len(self._values),
+                    'maxsize': self.maxsize}
@@ -0,0 +1,511 @@
+"""Canonical Huffman Encoding for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+The compressed file starts with a binary header holding only the code
+length of every byte value, from which encoder and decoder both derive the
+same canonical codes. Layout of the header:
+
+    magic      4 bytes, b'HUFC'
+    flags      1 byte, FLAG_DENSE selects the layout of the lengths,
+               FLAG_INDEX marks a seek index, FLAG_LIMIT a length limit
+    count      varint, the number of symbols encoded
+    interval   varint, only with FLAG_INDEX, the number of symbols between
+               checkpoints of the seek index
+    max_len    1 byte, only with FLAG_LIMIT, the longest code allowed
+    lengths    sparse: 1 byte number of symbols - 1, then a (symbol,
+               length) byte pair per symbol, a (0, 0) pair when empty
+               dense: 32 byte bitmap of the symbols present, then a
+               length byte per symbol present
+
+The bitstream of codes follows, padded with 0s to a whole byte. Unlike the
+text header format, every byte value is a plain symbol and the end of the
+data is given by count instead of a null character.
+
+With FLAG_INDEX the file ends with the seek index: for every checkpoint k,
+the bit offset into the bitstream of symbol k * interval, 8 bytes each.
+decode_range uses it to start decoding next to the requested data.
+
+With allow_stored, canonical_encode writes a stored file of huffman_stored
+instead when the header and bitstream would not be smaller than the data.
+"""
+
+import io
+import os
+
+from huffman_coding import create_flat_tree, create_code, read_chunks
+from huffman_coding import map_chunks
+from huffman_coding import CHUNK_SIZE
+from huffman_freq import byte_histogram
+from huffman_bit_reader import HuffmanBitReader, read_magic
+from huffman_bit_writer import HuffmanBitWriter
+from huffman_table import DecodeTable, DEFAULT_TABLE_BITS
+from huffman_stored import entropy_bits, coded_bits, coded_size, stored_size
+from huffman_stored import write_stored, is_stored, MAGIC as STORED_MAGIC
+
+MAGIC = b'HUFC'
+FLAG_DENSE = 0x01
+FLAG_INDEX = 0x02
+FLAG_LIMIT = 0x04
+KNOWN_FLAGS = FLAG_DENSE | FLAG_INDEX | FLAG_LIMIT
+INDEX_BYTES = 8
+MAX_LIMIT_TABLE_BITS = 16
+
+
+class Header:
+    """ Fields of a canonical header
+        Attributes:
+            flags (int): the header flags
+            count (int): the number of symbols encoded
+            lengths (list): 256 code lengths
+            interval (int): the number of symbols between checkpoints of
+                            the seek index, 0 without index
+            max_code_len (int): the length limit of the codes, 0 without
+            data_offset (int): the byte offset of the bitstream in the file
+    """
+
+    def __init__(self, flags, count, lengths, interval=0, max_code_len=0,
+                 data_offset=0):
+        """ Initialization implementation of object"""
+
+        self.flags = flags
+        self.count = count
+        self.lengths = lengths
+        self.interval = interval
+        self.max_code_len = max_code_len
+        self.data_offset = data_offset
+
+    def table_bits(self, table_bits):
+        """ Returns the primary table size to decode with. Length-limited
+            codes always fit a single table of max_code_len bits.
+            Args:
+                table_bits(int): the table size asked for
+            Returns:
+                int: the number of bits of the primary table
+        """
+
+        if 0 < self.max_code_len <= MAX_LIMIT_TABLE_BITS:
+            return self.max_code_len
+        return max(table_bits, 1)
+
+    def n_checkpoints(self):
+        """ Returns the number of checkpoints of the seek index"""
+
+        if not self.interval:
+            return 0
+        return -(-self.count // self.interval)
+
+
+def code_lengths(list_of_freqs, max_code_len=0):
+    """ Computes the Huffman code length of every symbol
+        Args:
+            list_of_freqs(list): list of 256 symbol frequencies
+            max_code_len(int): the longest code allowed, 0 for no limit
+        Returns:
+            list: 256 code lengths, 0 for symbols that do not occur
+    """
+
+    if max_code_len:
+        lengths = code_lengths(list_of_freqs)
+        if max(lengths) > max_code_len:
+            lengths = limited_code_lengths(list_of_freqs, max_code_len)
+        return lengths
+
+    hufftree = create_flat_tree(list_of_freqs)
+    if len(hufftree) == 1:
+        # a lone symbol still needs one bit per occurrence
+        lengths = [0] * 256
+        lengths[hufftree.chars[hufftree.root]] = 1
+        return lengths
+    return [length for _, length in create_code(hufftree, as_int=True)]
+
+
+def limited_code_lengths(list_of_freqs, max_code_len):
+    """ Computes optimal code lengths no longer than max_code_len with the
+        package-merge algorithm (Larmore and Hirschberg, 1990)
+        Args:
+            list_of_freqs(list): list of 256 symbol frequencies
+            max_code_len(int): the longest code allowed
+        Returns:
+            list: 256 code lengths, 0 for symbols that do not occur
+        Raises:
+            ValueError: if the symbols do not fit in max_code_len bits
+    """
+
+    leaves = sorted((freq, (sym,))
+                    for sym, freq in enumerate(list_of_freqs) if freq > 0)
+    lengths = [0] * len(list_of_freqs)
+    if len(leaves) == 1:
+        lengths[leaves[0][1][0]] = 1
+        return lengths
+    if len(leaves) > 1 << max_code_len:
+        raise ValueError('{} symbols do not fit in codes of {} bits'.format(
+            len(leaves), max_code_len))
+
+    items = leaves
+    for _ in range(max_code_len - 1):
+        packages = [(items[idx][0] + items[idx + 1][0],
+                     items[idx][1] + items[idx + 1][1])
+                    for idx in range(0, len(items) - 1, 2)]
+        items = sorted(leaves + packages, key=lambda item: item[0])
+
+    # every time a symbol is in one of the cheapest 2n - 2 items, its code
+    # gets one bit longer
+    for _, symbols in items[:2 * len(leaves) - 2]:
+        for sym in symbols:
+            lengths[sym] += 1
+    return lengths
+
+
+def canonical_codes(lengths):
+    """ Assigns canonical codes: shorter codes first, ties by symbol
+        Args:
+            lengths(list): 256 code lengths, 0 for unused symbols, longer
+                           lists for larger alphabets
+        Returns:
+            list: a (code, length) pair per symbol, (0, 0) for unused
+                  symbols
+        Raises:
+            ValueError: if the lengths do not form a prefix code
+    """
+
+    codes = [(0, 0)] * len(lengths)
+    code = 0
+    prev_length = 0
+    for length, sym in sorted((length, sym)
+                              for sym, length in enumerate(lengths) if length):
+        code = code << (length - prev_length)
+        if code >> length:
+            raise ValueError('code lengths do not form a prefix code')
+        codes[sym] = (code, length)
+        code += 1
+        prev_length = length
+    return codes
+
+
+def code_strings(codes):
+    """ Converts (code, length) pairs to strings of '0's and '1's
+        Args:
+            codes(list): (code, length) pairs as built by canonical_codes
+        Returns:
+            list: 256 strings as built by create_code
+    """
+
+    return [format(code, '0{}b'.format(length)) if length else ''
+            for code, length in codes]
+
+
+def write_header(writer, count, lengths, flags=0, interval=0,
+                 max_code_len=0):
+    """ Writes the binary header
+        Args:
+            writer(HuffmanBitWriter): writer at the start of the file
+            count(int): the number of symbols encoded
+            lengths(list): 256 code lengths
+            flags(int): extra flags of the header
+            interval(int): the number of symbols between checkpoints of the
+                           seek index, 0 for no index
+            max_code_len(int): the length limit of the codes, 0 for none
+    """
+
+    flags |= lengths_layout(lengths)
+    if interval:
+        flags |= FLAG_INDEX
+    if max_code_len:
+        flags |= FLAG_LIMIT
+    writer.write_bits(int.from_bytes(MAGIC, 'big'), 8 * len(MAGIC))
+    writer.write_bits(flags, 8)
+    write_varint(writer, count)
+    if interval:
+        write_varint(writer, interval)
+    if max_code_len:
+        writer.write_bits(max_code_len, 8)
+    write_lengths(writer, lengths, flags)
+
+
+def header_size(count, lengths, interval=0, max_code_len=0):
+    """ Returns the size of the header and seek index of a file
+        Args:
+            count(int): the number of symbols encoded
+            lengths(list): 256 code lengths
+            interval(int): the number of symbols between checkpoints of the
+                           seek index, 0 for no index
+            max_code_len(int): the length limit of the codes, 0 for none
+        Returns:
+            int: the number of bytes of the file besides the bitstream
+    """
+
+    writer = HuffmanBitWriter(io.BytesIO())
+    write_header(writer, count, lengths, 0, interval, max_code_len)
+    n_bits = writer.tell_bits()
+    writer.close()
+    return -(-n_bits // 8) + INDEX_BYTES * Header(
+        0, count, lengths, interval).n_checkpoints()
+
+
+def read_header(reader):
+    """ Reads the binary header
+        Args:
+            reader(HuffmanBitReader): reader at the start of the file
+        Returns:
+            Header: the fields of the header
+        Raises:
+            ValueError: if the file does not start with a canonical header
+    """
+
+    try:
+        if reader.read_bits(8 * len(MAGIC)) != int.from_bytes(MAGIC, 'big'):
+            raise ValueError('not a canonical Huffman file')
+        flags = reader.read_bits(8)
+        if flags & ~KNOWN_FLAGS:
+            raise ValueError('unknown header flags {:#x}'.format(flags))
+        count = read_varint(reader)
+        interval = read_varint(reader) if flags & FLAG_INDEX else 0
+        if flags & FLAG_INDEX and not interval:
+            raise ValueError('seek index interval is 0')
+        max_code_len = reader.read_bits(8) if flags & FLAG_LIMIT else 0
+        lengths = read_lengths(reader, flags)
+    except EOFError:
+        raise ValueError('canonical Huffman header is truncated')
+    if max_code_len and max(lengths) > max_code_len:
+        raise ValueError('code lengths exceed the limit of the header')
+    return Header(flags, count, lengths, interval, max_code_len,
+                  reader.tell())
+
+
+def lengths_layout(lengths):
+    """ Picks the smaller layout for a table of code lengths
+        Args:
+            lengths(list): 256 code lengths
+        Returns:
+            int: FLAG_DENSE for the bitmap layout, 0 for the sparse one
+    """
+
+    if sum(1 for length in lengths if length) > 31:
+        return FLAG_DENSE
+    return 0
+
+
+def write_lengths(writer, lengths, flags):
+    """ Writes a table of code lengths
+        Args:
+            writer(HuffmanBitWriter): the writer
+            lengths(list): 256 code lengths
+            flags(int): header flags, FLAG_DENSE selects the layout
+    """
+
+    present = [sym for sym in range(256) if lengths[sym]]
+    if flags & FLAG_DENSE:
+        bitmap = 0
+        for sym in present:
+            bitmap |= 1 << (255 - sym)
+        writer.write_bits(bitmap, 256)
+        for sym in present:
+            writer.write_bits(lengths[sym], 8)
+    elif present:
+        writer.write_bits(len(present) - 1, 8)
+        for sym in present:
+            writer.write_bits(sym, 8)
+            writer.write_bits(lengths[sym], 8)
+    else:
+        writer.write_bits(0, 24)
+
+
+def read_lengths(reader, flags):
+    """ Reads a table of code lengths written by write_lengths
+        Args:
+            reader(HuffmanBitReader): the reader
+            flags(int): header flags, FLAG_DENSE selects the layout
+        Returns:
+            list: 256 code lengths
+    """
+
+    lengths = [0] * 256
+    if flags & FLAG_DENSE:
+        bitmap = reader.read_bits(256)
+        for sym in range(256):
+            if bitmap & (1 << (255 - sym)):
+                lengths[sym] = reader.read_bits(8)
+    else:
+        for _ in range(reader.read_bits(8) + 1):
+            sym = reader.read_bits(8)
+            lengths[sym] = reader.read_bits(8)
+    return lengths
+
+
+def write_varint(writer, value):
+    """ Writes an unsigned int 7 bits per byte, low bits first
+        Args:
+            writer(HuffmanBitWriter): the writer
+            value(int): the value to be written
+    """
+
+    while value > 0x7F:
+        writer.write_bits(0x80 | (value & 0x7F), 8)
+        value >>= 7
+    writer.write_bits(value, 8)
+
+
+def read_varint(reader):
+    """ Reads an unsigned int written by write_varint
+        Args:
+            reader(HuffmanBitReader): the reader
+        Returns:
+            int: the value read
+    """
+
+    value = 0
+    shift = 0
+    while True:
+        byte = reader.read_bits(8)
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value
+        shift += 7
+
+
+def is_canonical(encoded_file):
+    """ Checks whether a file starts with the canonical header
+        Args:
+            encoded_file(str): name of the encoded file
+        Returns:
+            bool: True for canonical files, False for text header files
+    """
+
+    return read_magic(encoded_file) == MAGIC
+
+
+def canonical_encode(in_file, out_file, chunk_size=CHUNK_SIZE,
+                     index_interval=0, max_code_len=0, allow_stored=False):
+    """ Encodes the bytes of a file with canonical codes
+        Args:
+            in_file(str): the name of file being read into
+            out_file(str): the name of the compressed file
+            chunk_size(int): the number of bytes encoded at a time
+            index_interval(int): the number of symbols between checkpoints
+                                 of a seek index, 0 for no index
+            max_code_len(int): the longest code allowed, e.g. 12 or 15 to
+                               bound the decode table, 0 for no limit
+            allow_stored(bool): write a stored file of the raw data instead
+                                when the encoded file would not be smaller
+        Returns:
+            None
+    """
+
+    freq_list = byte_histogram(read_chunks(in_file, chunk_size, True))
+    # the entropy bounds the size from below without building the codes
+    raw_size = stored_size(sum(freq_list))
+    if allow_stored and coded_size(0, entropy_bits(freq_list)) >= raw_size:
+        write_stored(read_chunks(in_file, chunk_size, True), out_file)
+        return
+    lengths = code_lengths(freq_list, max_code_len)
+    codes = canonical_codes(lengths)
+    if allow_stored and coded_size(
+            header_size(sum(freq_list), lengths, index_interval,
+                        max_code_len), coded_bits(freq_list, codes)) \
+            >= raw_size:
+        write_stored(read_chunks(in_file, chunk_size, True), out_file)
+        return
+
+    comp_file = HuffmanBitWriter(out_file)
+    write_header(comp_file, sum(freq_list), lengths, 0, index_interval,
+                 max_code_len)
+    if not index_interval:
+        for chunk in read_chunks(in_file, chunk_size, True):
+            comp_file.write_codes(chunk, codes)
+        comp_file.close()
+        return
+
+    start = comp_file.tell_bits()
+    checkpoints = []
+    position = 0
+    for chunk in read_chunks(in_file, chunk_size, True):
+        idx = 0
+        while idx < len(chunk):
+            if position % index_interval == 0:
+                checkpoints.append(comp_file.tell_bits() - start)
+            step = min(len(chunk) - idx,
+                       index_interval - position % index_interval)
+            comp_file.write_codes(chunk[idx:idx + step], codes)
+            idx += step
+            position += step
+    comp_file.close()
+
+    with open(out_file, 'ab') as file:
+        for offset in checkpoints:
+            file.write(offset.to_bytes(INDEX_BYTES, 'big'))
+
+
+def iter_canonical_decode(encoded_file, chunk_size=CHUNK_SIZE,
+                          table_bits=DEFAULT_TABLE_BITS, use_mmap=False):
+    """ Decodes a canonical file lazily, one piece at a time
+        Args:
+            encoded_file(str): name of the encoded file
+            chunk_size(int): the number of encoded bytes read per piece
+            table_bits(int): the number of bits resolved per table lookup
+            use_mmap(bool): read the bitstream through a memory map
+        Returns:
+            generator: yields the decoded data as bytes pieces
+    """
+
+    encode_file = HuffmanBitReader(encoded_file, chunk_size)
+    try:
+        header = read_header(encode_file)
+        table = DecodeTable(code_strings(canonical_codes(header.lengths)),
+                            header.table_bits(table_bits))
+        if use_mmap:
+            chunks = map_chunks(encoded_file, chunk_size, header.data_offset)
+        else:
+            chunks = encode_file.iter_bytes()
+        yield from table.decode(chunks, count=header.count)
+    finally:
+        encode_file.close()
+
+
+def decode_range(encoded_file, start, length, table_bits=DEFAULT_TABLE_BITS):
+    """ Decodes a slice of the data, starting from the nearest checkpoint
+        of the seek index when the file has one, stored files are read
+        directly
+        Args:
+            encoded_file(str): name of the encoded file
+            start(int): the offset of the first byte in the decoded data
+            length(int): the number of bytes wanted
+            table_bits(int): the number of bits resolved per table lookup
+        Returns:
+            bytes: the decoded bytes, fewer than length at the end of data
+        Raises:
+            ValueError: if start is negative
+    """
+
+    if start < 0:
+        raise ValueError('start must not be negative, got {}'.format(start))
+    if is_stored(encoded_file):
+        with open(encoded_file, 'rb') as file:
+            file.seek(len(STORED_MAGIC) + start)
+            return file.read(max(length, 0))
+
+    with open(encoded_file, 'rb') as file:
+        encode_file = HuffmanBitReader(file)
+        header = read_header(encode_file)
+        length = max(0, min(length, header.count - start))
+        if length == 0:
+            return b''
+
+        skip_symbols = start
+        bit_offset = 0
+        if header.interval:
+            checkpoint = start // header.interval
+            index_start = os.path.getsize(encoded_file) \
+                - INDEX_BYTES * header.n_checkpoints()
+            file.seek(index_start + INDEX_BYTES * checkpoint)
+            bit_offset = int.from_bytes(file.read(INDEX_BYTES), 'big')
+            skip_symbols = start - checkpoint * header.interval
+
+        file.seek(header.data_offset + bit_offset // 8)
+        table = DecodeTable(code_strings(canonical_codes(header.lengths)),
+                            header.table_bits(table_bits))
+        data = b''.join(table.decode(HuffmanBitReader(file).iter_bytes(),
+                                     count=skip_symbols + length,
+                                     skip=bit_offset % 8))
+    return data[skip_symbols:]
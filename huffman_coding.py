@@ -4,29 +4,109 @@ Quarter: Spring 2020
 Author: Chris Linthacum
 """
 
-from huffman import HuffmanNode
+import mmap
+import os
+
+from huffman import HuffmanNode, FlatHuffmanTree, NO_CHILD
 from min_pq import MinPQ
 from huffman_bit_writer import HuffmanBitWriter
-from huffman_bit_reader import HuffmanBitReader
+from huffman_bit_reader import HuffmanBitReader, read_magic
+from huffman_table import DecodeTable, DEFAULT_TABLE_BITS
+from huffman_freq import byte_histogram
+from huffman_cache import LRUCache
+from huffman_stats import stage_timer, timed_iter
+from huffman_stored import entropy_bits, coded_bits, coded_size, stored_size
+from huffman_stored import write_stored, iter_stored_decode
+from huffman_stored import MAGIC as STORED_MAGIC
+
+CHUNK_SIZE = 1 << 16
+
+def read_chunks(filename, chunk_size=CHUNK_SIZE, binary=False,
+                use_mmap=False):
+    """ Reads a file in pieces so memory use does not grow with it
+        Args:
+            filename(str): the name of file to be opened
+            chunk_size(int): the number of characters per piece
+            binary(bool): read raw bytes instead of text characters
+            use_mmap(bool): read raw bytes through a memory map, only with
+                            binary
+        Returns:
+            generator: yields the characters of the file as bytes of up to
+                       chunk_size symbols each, memoryviews with use_mmap
+        Raises:
+            ValueError: if use_mmap is set without binary
+    """
 
-def cnt_freq(filename):
+    if use_mmap and not binary:
+        raise ValueError('use_mmap reads raw bytes, it needs binary=True')
+    if use_mmap:
+        return map_chunks(filename, chunk_size)
+    return _read_file(filename, chunk_size, binary)
+
+def _read_file(filename, chunk_size, binary):
+    """ Generator of read_chunks without a memory map"""
+
+    if binary:
+        with open(filename, 'rb') as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    with open(filename, 'r') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk.encode('latin-1')
+
+def map_chunks(filename, chunk_size=CHUNK_SIZE, offset=0):
+    """ Reads a file through a read-only memory map. The pieces are views
+        of the page cache, so they are not copied into the heap.
+        Args:
+            filename(str): the name of file to be mapped
+            chunk_size(int): the number of bytes per piece
+            offset(int): the position of the first byte read
+        Returns:
+            generator: yields memoryviews of up to chunk_size bytes
+    """
+
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size <= offset:
+            return
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    # no explicit close: callers may still hold the last piece, the map
+    # is released with the last view of it
+    view = memoryview(mapped)
+    for pos in range(offset, len(view), chunk_size):
+        yield view[pos:pos + chunk_size]
+
+def cnt_freq(filename, chunk_size=CHUNK_SIZE, binary=False, use_mmap=False):
     """ Opens text file and counts the frequency of occurrences of all
         characters within the file.
         Args:
             filename(str): the name of file to be opened
+            chunk_size(int): the number of characters read at a time
+            binary(bool): count raw bytes instead of text characters
+            use_mmap(bool): count raw bytes through a memory map, only with
+                            binary
         Returns:
             arr: 256 item list with count of every character occurrences
+        Raises:
+            ValueError: if raw bytes hold the null character, which ends
+                        the data of the text header format, or if use_mmap
+                        is set without binary
     """
 
-    file = open(filename, 'r')
-    out_list = [0] * 256
-
-    for line in file:
-        for char in line:
-            ascii_val = ord(char)
-            out_list[ascii_val] += 1
-
-    file.close()
+    out_list = byte_histogram(read_chunks(filename, chunk_size, binary,
+                                          use_mmap))
+    if binary and out_list[0]:
+        raise ValueError('{} holds null bytes, which the text header '
+                         'format cannot encode; use canonical_encode'
+                         .format(filename))
 
     out_list[0] = 1
 
@@ -58,27 +138,179 @@ def create_huff_tree(list_of_freqs):
     while priority_queue.size() > 1:
         # Retrieves the two smallest occurring Nodes from the queue
         node_1 = priority_queue.del_min()
-        node_2 = priority_queue.del_min()
+        node_2 = priority_queue.min()
 
         # Determine the representation of the min chr representation
         min_chr = min(node_1.char, node_2.char)
 
-        # Sum the different frequencies, create new Node, and add to queue
+        # Sum the different frequencies, create new Node, and put it in
+        # place of node_2 with a single sift
         sum_freq = node_1.freq + node_2.freq
         new_node = HuffmanNode(sum_freq, min_chr, node_1, node_2)
-        priority_queue.insert(new_node)
+        priority_queue.replace(new_node)
 
     return priority_queue.del_min()
 
-def create_code(root_node):
+def create_huff_tree_linear(list_of_freqs):
+    """ Create the same Huffman Tree as create_huff_tree in linear time
+        after one sort. Merged nodes come out in increasing order, so two
+        queues, one of leaves and one of merged nodes, replace the MinPQ.
+        Args:
+            list_of_freqs(list): list with length of 256 characters
+        Returns:
+            HuffmanNode: the root node of the tree, None if no character
+                         occurs
+    """
+
+    leaves = [HuffmanNode(freq, chr(each))
+              for each, freq in enumerate(list_of_freqs) if freq > 0]
+    if not leaves:
+        return None
+    # a stable sort keeps equal frequencies in character order
+    leaves.sort(key=lambda node: node.freq)
+
+    merged = []
+    idx_leaf = 0
+    idx_merged = 0
+    for _ in range(len(leaves) - 1):
+        pair = []
+        for _ in range(2):
+            if idx_merged == len(merged) or (
+                    idx_leaf < len(leaves) and
+                    leaves[idx_leaf] < merged[idx_merged]):
+                pair.append(leaves[idx_leaf])
+                idx_leaf += 1
+            else:
+                pair.append(merged[idx_merged])
+                idx_merged += 1
+        node_1, node_2 = pair
+        merged.append(HuffmanNode(node_1.freq + node_2.freq,
+                                  min(node_1.char, node_2.char),
+                                  node_1, node_2))
+
+    return merged[-1] if merged else leaves[0]
+
+def create_flat_tree(list_of_freqs):
+    """ Create the same Huffman Tree as create_huff_tree_linear, stored as
+        a FlatHuffmanTree. The leaves get the first ids in sorted order and
+        the merged nodes the following ones, so both queues of the two-queue
+        builder are ranges of node ids.
+        Args:
+            list_of_freqs(list): list with length of 256 characters
+        Returns:
+            FlatHuffmanTree: the tree, with no nodes if no character occurs
+    """
+
+    tree = FlatHuffmanTree()
+    # a stable sort keeps equal frequencies in character order
+    for each in sorted((each for each, freq in enumerate(list_of_freqs)
+                        if freq > 0), key=list_of_freqs.__getitem__):
+        tree.add(list_of_freqs[each], each)
+    freqs = tree.freqs
+    chars = tree.chars
+
+    n_leaves = len(tree)
+    idx_leaf = 0
+    idx_merged = n_leaves
+    for _ in range(n_leaves - 1):
+        pair = []
+        for _ in range(2):
+            if idx_merged == len(freqs) or (
+                    idx_leaf < n_leaves and
+                    (freqs[idx_leaf], chars[idx_leaf]) <
+                    (freqs[idx_merged], chars[idx_merged])):
+                pair.append(idx_leaf)
+                idx_leaf += 1
+            else:
+                pair.append(idx_merged)
+                idx_merged += 1
+        node_1, node_2 = pair
+        tree.add(freqs[node_1] + freqs[node_2],
+                 min(chars[node_1], chars[node_2]), node_1, node_2)
+
+    return tree
+
+def code_lengths_in_place(freqs):
+    """ Computes minimum-redundancy code lengths in place, without building
+        a tree (Moffat and Katajainen, 1995). Works for alphabets of any
+        size.
+        Args:
+            freqs(list): symbol weights sorted in increasing order, replaced
+                         by the code length of each symbol
+        Returns:
+            None
+    """
+
+    size = len(freqs)
+    if size == 0:
+        return
+    if size == 1:
+        freqs[0] = 0
+        return
+
+    # Phase 1: weights of internal nodes, leaving parent pointers behind
+    freqs[0] += freqs[1]
+    root = 0
+    leaf = 2
+    for nxt in range(1, size - 1):
+        if leaf >= size or freqs[root] < freqs[leaf]:
+            freqs[nxt] = freqs[root]
+            freqs[root] = nxt
+            root += 1
+        else:
+            freqs[nxt] = freqs[leaf]
+            leaf += 1
+        if leaf >= size or (root < nxt and freqs[root] < freqs[leaf]):
+            freqs[nxt] += freqs[root]
+            freqs[root] = nxt
+            root += 1
+        else:
+            freqs[nxt] += freqs[leaf]
+            leaf += 1
+
+    # Phase 2: depths of internal nodes from the parent pointers
+    freqs[size - 2] = 0
+    for nxt in range(size - 3, -1, -1):
+        freqs[nxt] = freqs[freqs[nxt]] + 1
+
+    # Phase 3: depths of leaves from the number of internal nodes per level
+    available = 1
+    used = 0
+    depth = 0
+    root = size - 2
+    nxt = size - 1
+    while available > 0:
+        while root >= 0 and freqs[root] == depth:
+            used += 1
+            root -= 1
+        while available > used:
+            freqs[nxt] = depth
+            nxt -= 1
+            available -= 1
+        available = 2 * used
+        depth += 1
+        used = 0
+
+def create_code(root_node, as_int=False):
     """ Creates Huffman code for a given tree representation
         Args:
             root_node(HuffmanNode): the root of the tree being converted to
-                                    code
+                                    code, or a FlatHuffmanTree
+            as_int(bool): emit (code, length) integer pairs instead of
+                          strings, as consumed by HuffmanBitWriter.write_codes
         Returns:
-            list: list of 256 strings representing the code for each char
+            list: list of 256 strings representing the code for each char,
+                  or of 256 (code, length) pairs with (0, 0) for unused chars
     """
 
+    if isinstance(root_node, FlatHuffmanTree):
+        return create_flat_code(root_node, as_int)
+
+    if as_int:
+        out_list = [(0, 0)] * 256
+        create_int_code_helper(root_node, out_list, 0, 0)
+        return out_list
+
     out_list = [''] * 256
     current_path = ''
     create_code_helper(root_node, out_list, current_path)
@@ -105,38 +337,218 @@ def create_code_helper(root_node, out_list, current_path):
     else:
         out_list[ord(root_node.char)] = current_path
 
-def huffman_encode(in_file, out_file):
+
+def create_int_code_helper(root_node, out_list, code, length):
+    """ Recursive helper function for creating integer Huffman Code
+        Args:
+            root_node(HuffmanNode): the root node being traversed
+            out_list(list): list of (code, length) outputs
+            code(int): the bits of the current path through the tree
+            length(int): the number of bits of the current path
+        Returns:
+            None
+    """
+
+    if root_node.left is not None:
+        code = code << 1
+        create_int_code_helper(root_node.left, out_list, code, length + 1)
+        create_int_code_helper(root_node.right, out_list, code | 1,
+                               length + 1)
+    else:
+        out_list[ord(root_node.char)] = (code, length)
+
+
+def create_flat_code(tree, as_int=False):
+    """ Creates Huffman code for a FlatHuffmanTree, walking the node arrays
+        with an explicit stack
+        Args:
+            tree(FlatHuffmanTree): the tree being converted to code
+            as_int(bool): emit (code, length) integer pairs instead of
+                          strings
+        Returns:
+            list: list of 256 codes, as returned by create_code
+    """
+
+    out_list = [(0, 0)] * 256
+    left = tree.left
+    right = tree.right
+    stack = [(tree.root, 0, 0)] if len(tree) else []
+    while stack:
+        node, code, length = stack.pop()
+        if left[node] == NO_CHILD:
+            out_list[tree.chars[node]] = (code, length)
+        else:
+            stack.append((right[node], (code << 1) | 1, length + 1))
+            stack.append((left[node], code << 1, length + 1))
+
+    if as_int:
+        return out_list
+    return [format(code, '0{}b'.format(length)) if length else ''
+            for code, length in out_list]
+
+class CodeSet:
+    """ The tree and tables built from one histogram
+        Attributes:
+            tree (FlatHuffmanTree): the Huffman tree
+            codes (list): 256 code strings, as built by create_code
+            int_codes (list): 256 (code, length) pairs
+            tables (dict): the decode tables built so far by table bits
+    """
+
+    def __init__(self, list_of_freqs, stats=None):
+        """ Builds the tree and the code tables
+            Args:
+                list_of_freqs(list): list with length of 256 characters
+                stats(Stats): gets the time of the 'tree' and 'code' stages
+        """
+
+        stage = stage_timer(stats)
+        with stage('tree'):
+            self.tree = create_flat_tree(list_of_freqs)
+        with stage('code'):
+            self.codes = create_code(self.tree)
+            self.int_codes = create_code(self.tree, as_int=True)
+        self.tables = {}
+
+    def decode_table(self, table_bits):
+        """ Returns the decode table of the codes, built on first use
+            Args:
+                table_bits(int): the number of bits resolved per lookup
+            Returns:
+                DecodeTable: the decode table
+        """
+
+        if table_bits not in self.tables:
+            self.tables[table_bits] = DecodeTable(self.codes, table_bits)
+        return self.tables[table_bits]
+
+
+# histograms of recent encodes and decodes, with their trees and tables
+CODE_CACHE = LRUCache()
+
+def build_codes(list_of_freqs, cache=CODE_CACHE, stats=None):
+    """ Returns the CodeSet of a histogram, reusing the one of an equal
+        histogram from cache. The histogram itself is the key, so distinct
+        histograms never share codes.
+        Args:
+            list_of_freqs(list): list with length of 256 characters
+            cache(LRUCache): the cache consulted, None to always build
+            stats(Stats): gets the build times, the tree depth and whether
+                          the cache had the codes
+        Returns:
+            CodeSet: the tree and tables of the histogram
+    """
+
+    if cache is None:
+        code_set = CodeSet(list_of_freqs, stats)
+    else:
+        hits = cache.hits
+        code_set = cache.get(tuple(list_of_freqs),
+                             lambda: CodeSet(list_of_freqs, stats))
+    if stats is not None:
+        if cache is not None:
+            stats.cache_hit = cache.hits > hits
+        stats.tree_depth = max(length for _, length in code_set.int_codes)
+    return code_set
+
+def huffman_encode(in_file, out_file, debug=True, chunk_size=CHUNK_SIZE,
+                   binary=False, use_mmap=False, cache=CODE_CACHE, stats=None,
+                   allow_stored=False):
     """ Reads a text input file and writes to an output file the encoded
-        version
+        version. The input is streamed in chunks, so memory use stays
+        bounded whatever the size of the file.
         Args:
             in_file(str): the name of file being read into
             out_file(str): the desired output name of the file
+            debug(bool): write out_file with the codes as '0's and '1's,
+                         otherwise only the compressed file is written
+            chunk_size(int): the number of characters encoded at a time
+            binary(bool): encode raw bytes instead of text characters
+            use_mmap(bool): read raw bytes through a memory map, both passes
+                            over the input then share the page cache, only
+                            with binary
+            cache(LRUCache): the cache of code tables consulted, None to
+                             always build them
+            stats(Stats): collects the times of the 'count', 'tree',
+                          'code', 'read', 'pack', 'debug' and 'close' stages
+                          and the sizes, None to skip the measurements
+            allow_stored(bool): write a stored file of the bytes of the
+                                input instead, without the debug file, when
+                                the encoded file would not be smaller
         Returns:
               None
+        Raises:
+            ValueError: if use_mmap is set without binary
     """
 
-    freq_list = cnt_freq(in_file)
-    hufftree = create_huff_tree(freq_list)
-    codes = create_code(hufftree)
+    if use_mmap and not binary:
+        raise ValueError('use_mmap reads raw bytes, it needs binary=True')
+    stage = stage_timer(stats)
+    with stage('count'):
+        freq_list = cnt_freq(in_file, chunk_size, binary, use_mmap)
     header = create_header(freq_list)
-    encoded_text = encode_text(in_file, codes)
-
-    # Write the uncompressed output file
-    file_output = open(out_file, 'w')
-    file_output.write(header)
-    file_output.write(' ')
-    file_output.write('\n')
-    file_output.write(encoded_text)
-    file_output.close()
-
-    # Write the compressed output file
+    # The compressed output file goes next to the uncompressed one
     compressed_filename = out_file[:-4] + '_compressed.txt'
+
+    # the entropy bounds the size from below without building the codes,
+    # a stored file keeps the bytes on disk, whatever the text encoding
+    raw_size = stored_size(os.path.getsize(in_file))
+    if allow_stored and coded_size(len(header) + 1,
+                                   entropy_bits(freq_list)) >= raw_size:
+        code_set = None
+    else:
+        code_set = build_codes(freq_list, cache, stats)
+    if allow_stored and (code_set is None or coded_size(
+            len(header) + 1,
+            coded_bits(freq_list, code_set.int_codes)) >= raw_size):
+        with stage('store'):
+            n_bytes = write_stored(timed_iter(
+                read_chunks(in_file, chunk_size, True, use_mmap), stats,
+                'read'), compressed_filename)
+        if stats is not None:
+            stats.operation = 'encode'
+            stats.bytes_in = n_bytes
+            stats.symbols = sum(freq_list) - 1
+            stats.header_bytes = len(STORED_MAGIC)
+            stats.bytes_out = os.path.getsize(compressed_filename)
+        return
+
+    codes = code_set.codes
+    int_codes = code_set.int_codes
     comp_file = HuffmanBitWriter(compressed_filename)
-    encoded_text += codes[0]
     comp_file.write_str(header)
     comp_file.write_str('\n')
-    comp_file.write_code(encoded_text)
-    comp_file.close()
+
+    # Write the uncompressed output file
+    file_output = None
+    if debug:
+        file_output = open(out_file, 'w')
+        file_output.write(header)
+        file_output.write(' ')
+        file_output.write('\n')
+
+    for chunk in timed_iter(read_chunks(in_file, chunk_size, binary,
+                                        use_mmap), stats, 'read'):
+        with stage('pack'):
+            comp_file.write_codes(chunk, int_codes)
+        if file_output is not None:
+            with stage('debug'):
+                file_output.write(''.join(map(codes.__getitem__, chunk)))
+        if stats is not None:
+            stats.reads += 1
+            stats.bytes_in += len(chunk)
+
+    with stage('close'):
+        if file_output is not None:
+            file_output.close()
+        comp_file.write_bits(*int_codes[0])
+        comp_file.close()
+    if stats is not None:
+        stats.operation = 'encode'
+        stats.symbols = stats.bytes_in
+        stats.header_bytes = len(header) + 1
+        stats.bytes_out = os.path.getsize(compressed_filename)
+        stats.flushes = comp_file.n_flushes
 
 def create_header(list_of_freqs):
     """ Creates the header for huffman_encode based off of a list of freqs
@@ -153,29 +565,44 @@ def create_header(list_of_freqs):
     out_str = out_str[:-1]
     return out_str
 
-def encode_text(in_file, codes):
+def encode_text(in_file, codes, use_mmap=False, binary=False):
     """ Encode a given file from a code list
         Args:
             in_file(str): the file name of the file to be encoded
             codes(list): codes list generated by create_code function
+            use_mmap(bool): read raw bytes through a memory map, only with
+                            binary
+            binary(bool): encode raw bytes instead of text characters
         Returns:
             str: string of encoded file
+        Raises:
+            ValueError: if use_mmap is set without binary
     """
-    encoded_str = ''
-    file = open(in_file, 'r')
-    for line in file:
-        for char in line:
-            encoded_str += codes[ord(char)]
-
-    file.close()
 
-    return encoded_str
+    return ''.join(''.join(map(codes.__getitem__, chunk))
+                   for chunk in read_chunks(in_file, binary=binary,
+                                            use_mmap=use_mmap))
 
-def huffman_decode(encoded_file, decode_file):
+def huffman_decode(encoded_file, decode_file, table_bits=DEFAULT_TABLE_BITS,
+                   chunk_size=CHUNK_SIZE, binary=False, use_mmap=False,
+                   cache=CODE_CACHE, stats=None):
     """ Decode the encoded file and output
         Args:
             encoded_file(str): name of the encoded file
             decode_file(str): desired name of output file
+            table_bits(int): the number of bits resolved per table lookup,
+                             0 walks the tree one bit at a time instead
+            chunk_size(int): the number of encoded bytes decoded and written
+                             out at a time
+            binary(bool): write raw bytes instead of text characters, files
+                          of canonical_encode are always written as bytes
+            use_mmap(bool): let the table decoders read the bitstream
+                            through a memory map
+            cache(LRUCache): the cache of code tables consulted, None to
+                             always build them
+            stats(Stats): collects the times of the 'header', 'tree',
+                          'code', 'table', 'decode' and 'write' stages and
+                          the sizes, None to skip the measurements
         Returns:
             None
     """
@@ -186,14 +613,174 @@ def huffman_decode(encoded_file, decode_file):
     except FileNotFoundError:
         raise FileNotFoundError
 
-    encode_file = HuffmanBitReader(encoded_file)
-    decoded_file = open(decode_file, 'w')
+    stage = stage_timer(stats)
+    binary_data = iter_binary_decode(encoded_file, chunk_size, table_bits,
+                                     use_mmap)
+    if binary_data is not None:
+        pieces = timed_iter(binary_data, stats, 'decode')
+        decoded_file = open(decode_file, 'wb')
+    elif table_bits:
+        pieces = iter_decode(encoded_file, chunk_size, table_bits, binary,
+                             use_mmap, cache, stats)
+        decoded_file = open(decode_file, 'wb' if binary else 'w')
+    else:
+        pieces = iter_tree_decode(encoded_file, chunk_size, binary, cache,
+                                  stats)
+        decoded_file = open(decode_file, 'wb' if binary else 'w')
+
+    with decoded_file:
+        for data in pieces:
+            with stage('write'):
+                decoded_file.write(data)
+            if stats is not None:
+                stats.flushes += 1
+                stats.symbols += len(data)
+    if stats is not None:
+        stats.operation = 'decode'
+        stats.bytes_in = os.path.getsize(encoded_file)
+        stats.bytes_out = os.path.getsize(decode_file)
+
+def iter_decode(encoded_file, chunk_size=CHUNK_SIZE,
+                table_bits=DEFAULT_TABLE_BITS, binary=False, use_mmap=False,
+                cache=CODE_CACHE, stats=None):
+    """ Decode the encoded file lazily, one piece at a time
+        Args:
+            encoded_file(str): name of the encoded file
+            chunk_size(int): the number of encoded bytes read per piece
+            table_bits(int): the number of bits resolved per table lookup
+            binary(bool): yield raw bytes instead of text
+            use_mmap(bool): read the bitstream through a memory map
+            cache(LRUCache): the cache of code tables consulted, None to
+                             always build them
+            stats(Stats): collects the times of the 'header', 'tree',
+                          'code', 'table' and 'decode' stages
+        Returns:
+            generator: yields the decoded text as str pieces, or as bytes
+                       pieces when binary
+    """
+
+    binary_data = iter_binary_decode(encoded_file, chunk_size, table_bits,
+                                     use_mmap)
+    if binary_data is not None:
+        for data in timed_iter(binary_data, stats, 'decode'):
+            yield data if binary else data.decode('latin-1')
+        return
+
+    stage = stage_timer(stats)
+    header_bytes = None
+    encode_file = HuffmanBitReader(encoded_file, chunk_size)
+    try:
+        with stage('header'):
+            freq_list = read_header(encode_file)
+        header_bytes = encode_file.tell()
+        code_set = build_codes(freq_list, cache, stats)
+        with stage('table'):
+            table = code_set.decode_table(table_bits)
+        if use_mmap:
+            chunks = map_chunks(encoded_file, chunk_size, header_bytes)
+        else:
+            chunks = encode_file.iter_bytes()
+        for data in timed_iter(table.decode(chunks, eof=0), stats,
+                               'decode'):
+            yield data if binary else data.decode('latin-1')
+    finally:
+        encode_file.close()
+        if stats is not None:
+            stats.header_bytes = header_bytes
+            stats.reads = encode_file.n_reads
+
+def iter_tree_decode(encoded_file, chunk_size=CHUNK_SIZE, binary=False,
+                     cache=CODE_CACHE, stats=None):
+    """ Decode the encoded file lazily by walking the Huffman tree bit by
+        bit, one piece at a time
+        Args:
+            encoded_file(str): name of the encoded file
+            chunk_size(int): the number of characters per piece
+            binary(bool): yield raw bytes instead of text
+            cache(LRUCache): the cache of code tables consulted, None to
+                             always build them
+            stats(Stats): collects the times of the 'header', 'tree',
+                          'code' and 'decode' stages
+        Returns:
+            generator: yields the decoded text as str pieces, or as bytes
+                       pieces when binary
+    """
+
+    stage = stage_timer(stats)
+    header_bytes = None
+    encode_file = HuffmanBitReader(encoded_file, chunk_size)
+    try:
+        with stage('header'):
+            freq_list = read_header(encode_file)
+        header_bytes = encode_file.tell()
+        huff_tree = build_codes(freq_list, cache, stats).tree
+        for text in timed_iter(flat_tree_decode(encode_file, huff_tree,
+                                                chunk_size), stats,
+                               'decode'):
+            yield text.encode('latin-1') if binary else text
+    finally:
+        encode_file.close()
+        if stats is not None:
+            stats.header_bytes = header_bytes
+            stats.reads = encode_file.n_reads
+
+def iter_binary_decode(encoded_file, chunk_size, table_bits, use_mmap=False):
+    """ Picks the decoder of the binary header formats, which hold raw bytes
+        Args:
+            encoded_file(str): name of the encoded file
+            chunk_size(int): the number of encoded bytes read per piece
+            table_bits(int): the number of bits resolved per table lookup
+            use_mmap(bool): read the bitstream through a memory map
+        Returns:
+            generator: yields the decoded bytes, None for text header files
+    """
+
+    # imported here as these formats build on this module
+    from huffman_canonical import iter_canonical_decode
+    from huffman_canonical import MAGIC as CANONICAL_MAGIC
+    from huffman_parallel import iter_parallel_decode
+    from huffman_parallel import MAGIC as PARALLEL_MAGIC
+    from huffman_adaptive import iter_adaptive_decode
+    from huffman_adaptive import MAGIC as ADAPTIVE_MAGIC
+
+    magic = read_magic(encoded_file)
+    if magic == CANONICAL_MAGIC:
+        return iter_canonical_decode(encoded_file, chunk_size, table_bits,
+                                     use_mmap)
+    if magic == PARALLEL_MAGIC:
+        return iter_parallel_decode(encoded_file, 1, table_bits)
+    if magic == ADAPTIVE_MAGIC:
+        return iter_adaptive_decode(encoded_file, chunk_size)
+    if magic == STORED_MAGIC:
+        return iter_stored_decode(encoded_file, chunk_size)
+    return None
+
+def read_header(encode_file):
+    """ Reads the header line of an encoded file
+        Args:
+            encode_file(HuffmanBitReader): reader at the start of the file
+        Returns:
+            list: list of 256 frequencies of the characters
+    """
+
     header = str(encode_file.read_str())
     header = header[2:]
     header = header[:-3]
-    freq_list = parse_header(header)
-    huff_tree = create_huff_tree(freq_list)
-    code = create_code(huff_tree)
+    return parse_header(header)
+
+def tree_decode(encode_file, huff_tree):
+    """ Decode the bits of a file by walking the Huffman tree bit by bit
+        Args:
+            encode_file(HuffmanBitReader): reader positioned after the header
+            huff_tree(HuffmanNode): the root of the Huffman tree, or a
+                                    FlatHuffmanTree
+        Returns:
+            str: the decoded text up to the null character
+    """
+
+    if isinstance(huff_tree, FlatHuffmanTree):
+        return ''.join(flat_tree_decode(encode_file, huff_tree))
+
     found_null = False
     out_str = ''
     node = huff_tree
@@ -210,9 +797,39 @@ def huffman_decode(encoded_file, decode_file):
             if val:
                 node = node.right
 
-    decoded_file.write(out_str)
-    encode_file.close()
-    decoded_file.close()
+    return out_str
+
+def flat_tree_decode(encode_file, tree, chunk_size=CHUNK_SIZE):
+    """ Decode the bits of a file by walking the node arrays of a
+        FlatHuffmanTree bit by bit
+        Args:
+            encode_file(HuffmanBitReader): reader positioned after the header
+            tree(FlatHuffmanTree): the Huffman tree
+            chunk_size(int): the number of characters per piece
+        Returns:
+            generator: yields the decoded text up to the null character as
+                       str pieces of up to chunk_size characters
+    """
+
+    left = tree.left
+    right = tree.right
+    chars = tree.chars
+    root = tree.root
+    out = bytearray()
+    node = root
+    while True:
+        if left[node] == NO_CHILD:
+            if chars[node] == 0:
+                break
+            out.append(chars[node])
+            if len(out) >= chunk_size:
+                yield out.decode('latin-1')
+                out.clear()
+            node = root
+        node = right[node] if encode_file.read_bit() else left[node]
+
+    if out:
+        yield out.decode('latin-1')
 
 def parse_header(header_string):
     """ Parse the header into a list of freqs
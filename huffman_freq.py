@@ -0,0 +1,39 @@
+"""Byte frequency counting for the Huffman Encoding of Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+NumPy is used when it is installed, otherwise the counting falls back to
+collections.Counter, which also runs at C speed over whole blocks.
+"""
+
+from collections import Counter
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+
+def byte_histogram(blocks):
+    """ Counts the occurrences of every byte value over blocks of data
+        Args:
+            blocks(iterable): bytes-like objects
+        Returns:
+            list: 256 item list with the count of every byte value
+    """
+
+    if numpy is not None:
+        counts = numpy.zeros(256, dtype=numpy.int64)
+        for block in blocks:
+            counts += numpy.bincount(numpy.frombuffer(block, numpy.uint8),
+                                     minlength=256)
+        return counts.tolist()
+
+    counter = Counter()
+    for block in blocks:
+        counter.update(bytes(block))
+    out_list = [0] * 256
+    for value, count in counter.items():
+        out_list[value] = count
+    return out_list
@@ -0,0 +1,314 @@
+"""In-memory Huffman Encoding for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+Encodes and decodes buffers and file objects without temporary files. The
+output is the same as a file of canonical_encode, whose symbol count ends
+the data, so payloads may hold any byte value including the null
+character. Buffers are read through memoryviews, so bytes, bytearray,
+memoryview and mmap inputs are not copied. StreamDecoder decodes data
+pushed to it a piece at a time, whatever the format.
+"""
+
+import io
+
+from huffman_bit_writer import HuffmanBitWriter
+from huffman_bit_reader import HuffmanBitReader
+from huffman_canonical import code_lengths, canonical_codes, code_strings
+from huffman_canonical import write_header, read_header, MAGIC
+from huffman_adaptive import AdaptiveDecoder, MAGIC as ADAPTIVE_MAGIC
+from huffman_adaptive import MAX_SYMBOL_BITS
+from huffman_stored import MAGIC as STORED_MAGIC
+from huffman_coding import CHUNK_SIZE, build_codes
+from huffman_coding import read_header as read_text_header
+from huffman_freq import byte_histogram
+from huffman_table import DecodeTable, TableDecoder, DEFAULT_TABLE_BITS
+
+# longer than the largest header: magic, flags, two varints, limit byte
+# and a dense lengths table
+HEADER_WINDOW = 512
+
+
+def encode_bytes(buf, chunk_size=CHUNK_SIZE, max_code_len=0):
+    """ Encodes the bytes of a buffer
+        Args:
+            buf(bytes-like): any object supporting the buffer protocol
+            chunk_size(int): the number of bytes encoded at a time
+            max_code_len(int): the longest code allowed, 0 for no limit
+        Returns:
+            bytes: the compressed data
+    """
+
+    data = memoryview(buf).cast('B')
+    chunks = [data[pos:pos + chunk_size]
+              for pos in range(0, len(data), chunk_size)]
+    out = io.BytesIO()
+    writer = HuffmanBitWriter(out)
+    write_encoded(writer, byte_histogram(chunks), chunks, max_code_len)
+    writer.close()
+    return out.getvalue()
+
+
+def encode_fileobj(in_file, out_file, chunk_size=CHUNK_SIZE,
+                   max_code_len=0):
+    """ Encodes the rest of a binary file object into another one. The
+        input is read twice, so it must be seekable.
+        Args:
+            in_file(file): binary file object being read from
+            out_file(file): binary file object the compressed data is
+                            written to, it is left open
+            chunk_size(int): the number of bytes read at a time
+            max_code_len(int): the longest code allowed, 0 for no limit
+        Returns:
+            None
+    """
+
+    start = in_file.tell()
+    freq_list = byte_histogram(_read_chunks(in_file, chunk_size))
+    in_file.seek(start)
+    writer = HuffmanBitWriter(out_file)
+    write_encoded(writer, freq_list, _read_chunks(in_file, chunk_size),
+                  max_code_len)
+    writer.close()
+
+
+def write_encoded(writer, freq_list, chunks, max_code_len=0):
+    """ Writes the header and the bitstream of the encoded data
+        Args:
+            writer(HuffmanBitWriter): writer at the start of the output
+            freq_list(list): 256 counts of the bytes of chunks
+            chunks(iterable): the data as bytes-like pieces
+            max_code_len(int): the longest code allowed, 0 for no limit
+        Returns:
+            None
+    """
+
+    lengths = code_lengths(freq_list, max_code_len)
+    codes = canonical_codes(lengths)
+    write_header(writer, sum(freq_list), lengths, 0, 0, max_code_len)
+    for chunk in chunks:
+        writer.write_codes(chunk, codes)
+
+
+def decode_into(buf, out, table_bits=DEFAULT_TABLE_BITS,
+                chunk_size=CHUNK_SIZE):
+    """ Decodes compressed data from a buffer, appending it to out
+        Args:
+            buf(bytes-like): the compressed data, any object supporting the
+                             buffer protocol
+            out(bytearray): the decoded bytes are appended to it
+            table_bits(int): the number of bits resolved per table lookup
+            chunk_size(int): the number of encoded bytes decoded at a time
+        Returns:
+            int: the number of bytes appended to out
+        Raises:
+            ValueError: if the header is invalid or the data is truncated
+    """
+
+    data = memoryview(buf).cast('B')
+    header = read_header(HuffmanBitReader(io.BytesIO(
+        bytes(data[:HEADER_WINDOW]))))
+    chunks = (data[pos:pos + chunk_size]
+              for pos in range(header.data_offset, len(data), chunk_size))
+    start = len(out)
+    for piece in _table(header, table_bits).decode(chunks,
+                                                   count=header.count):
+        out += piece
+    return len(out) - start
+
+
+def decode_fileobj(in_file, out_file, table_bits=DEFAULT_TABLE_BITS,
+                   chunk_size=CHUNK_SIZE):
+    """ Decodes compressed data from a binary file object into another one.
+        The format is told by the start of the data: canonical, adaptive,
+        stored or the text header of huffman_encode.
+        Args:
+            in_file(file): binary file object being read from, positioned
+                           at the header
+            out_file(file): binary file object the decoded bytes are
+                            written to, it is left open
+            table_bits(int): the number of bits resolved per table lookup
+            chunk_size(int): the number of encoded bytes read at a time
+        Returns:
+            int: the number of decoded bytes
+        Raises:
+            ValueError: if the header is invalid or the data is truncated
+    """
+
+    decoder = StreamDecoder(table_bits)
+    size = 0
+    for chunk in _read_chunks(in_file, chunk_size):
+        data = decoder.feed(chunk)
+        if data:
+            out_file.write(data)
+            size += len(data)
+    data = decoder.finish()
+    if data:
+        out_file.write(data)
+        size += len(data)
+    return size
+
+
+class StreamDecoder:
+    """ Decodes compressed data pushed to it a piece at a time, for callers
+        that do their own reading such as the asyncio coders. The format is
+        told by the start of the data: canonical, adaptive, stored or the
+        text header of huffman_encode. Adaptive symbols are decoded once
+        MAX_SYMBOL_BITS bits follow their start, or at the end.
+        Attributes:
+            table_bits (int): the number of bits resolved per table lookup
+            head (bytearray): the data received while the header is not
+                              complete
+            kind (str): 'table', 'adaptive' or 'stored' once the header is
+                        read, None before
+            decoder: the TableDecoder or AdaptiveDecoder of the data
+    """
+
+    def __init__(self, table_bits=DEFAULT_TABLE_BITS):
+        """ Initialization implementation of object"""
+
+        self.table_bits = table_bits
+        self.head = bytearray()
+        self.kind = None
+        self.decoder = None
+        self._pending = None
+
+    def feed(self, data):
+        """ Decodes the next piece of compressed data
+            Args:
+                data(bytes-like): the piece
+            Returns:
+                bytes: the data decoded so far and not returned before
+            Raises:
+                ValueError: if the header or a code is invalid
+        """
+
+        if self.kind is None:
+            self.head += data
+            data = self._start(False)
+            if data is None:
+                return b''
+        return self._decode(data, False)
+
+    def finish(self):
+        """ Ends the compressed data
+            Returns:
+                bytes: the rest of the decoded data
+            Raises:
+                ValueError: if the header is invalid or the data is
+                            truncated
+        """
+
+        data = b''
+        if self.kind is None:
+            data = self._start(True)
+        return self._decode(data, True)
+
+    def _start(self, final):
+        """ Reads the header once head holds it
+            Args:
+                final(bool): whether no more data will come
+            Returns:
+                bytes: the data after the header, None if it is incomplete
+        """
+
+        head = self.head
+        if len(head) < len(MAGIC) and not final:
+            return None
+        magic = bytes(head[:len(MAGIC)])
+        if magic == MAGIC:
+            if len(head) < HEADER_WINDOW and not final:
+                return None
+            header = read_header(HuffmanBitReader(io.BytesIO(
+                bytes(head[:HEADER_WINDOW]))))
+            self.decoder = TableDecoder(_table(header, self.table_bits),
+                                        header.count)
+            self.kind = 'table'
+            rest = head[header.data_offset:]
+        elif magic == ADAPTIVE_MAGIC:
+            self._pending = _Pending(head)
+            self.decoder = AdaptiveDecoder(HuffmanBitReader(self._pending))
+            self.kind = 'adaptive'
+            rest = b''
+        elif magic == STORED_MAGIC:
+            self.kind = 'stored'
+            rest = head[len(STORED_MAGIC):]
+        else:
+            end = head.find(b'\n')
+            if end < 0:
+                if not final:
+                    return None
+                raise ValueError('text header is truncated')
+            freq_list = read_text_header(HuffmanBitReader(io.BytesIO(
+                bytes(head[:end + 1]))))
+            self.decoder = TableDecoder(build_codes(freq_list).decode_table(
+                self.table_bits), eof=0)
+            self.kind = 'table'
+            rest = head[end + 1:]
+        self.head = None
+        return bytes(rest)
+
+    def _decode(self, data, final):
+        """ Decodes data, and the end of the data when final"""
+
+        if self.kind == 'stored':
+            return bytes(data)
+        if self.kind == 'table':
+            out = self.decoder.feed(data)
+            if final:
+                out += self.decoder.finish()
+            return out
+
+        decoder = self.decoder
+        if decoder.done:
+            return b''
+        reader = decoder.reader
+        self._pending.data += data
+        if final:
+            return decoder.read()
+        out = bytearray()
+        while not decoder.done:
+            n_bits = reader.n_bits + 8 * (len(reader.buffer) - reader.pos
+                                          + len(self._pending.data))
+            # every symbol read has all of its bits
+            n_symbols = n_bits // MAX_SYMBOL_BITS
+            if not n_symbols:
+                break
+            out += decoder.read(n_symbols)
+        return bytes(out)
+
+
+class _Pending:
+    """ Binary file object reading the bytes pushed to a StreamDecoder"""
+
+    def __init__(self, data):
+        """ Initialization implementation of object"""
+
+        self.data = bytearray(data)
+
+    def read(self, size=-1):
+        """ Reads up to size bytes, b'' when none are pending"""
+
+        if size < 0:
+            size = len(self.data)
+        out = bytes(self.data[:size])
+        del self.data[:size]
+        return out
+
+
+def _table(header, table_bits):
+    """ Builds the decode table of a canonical header"""
+
+    return DecodeTable(code_strings(canonical_codes(header.lengths)),
+                       header.table_bits(table_bits))
+
+
+def _read_chunks(file, chunk_size):
+    """ Yields the rest of a binary file object in pieces"""
+
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
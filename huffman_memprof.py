@@ -0,0 +1,151 @@
+"""Memory profiling of the Huffman Encoding for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+Run with: python huffman_memprof.py [size ...] [options]
+
+Encodes and decodes corpora of each size under tracemalloc and prints the
+peak memory allocated by every stage, as bytes and as a multiple of the
+input size, so the scaling of memory can be followed like throughput.
+--budget CASE=RATIO fails the run when the peak of a case grows past
+RATIO times the input size, e.g. --budget decode=0.5. Sizes take K, M
+and G suffixes and --json appends the records to a file as JSON lines.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from huffman_bench import make_corpus, parse_size, PROFILES
+from huffman_coding import huffman_encode
+from huffman_coding import huffman_decode
+from huffman_stats import MemoryStats
+
+
+# name -> (function measured, whether it needs the corpus encoded first)
+CASES = {
+    'encode': (lambda text, encoded, compressed, decoded, stats:
+               huffman_encode(text, encoded, False, cache=None,
+                              stats=stats), False),
+    'decode': (lambda text, encoded, compressed, decoded, stats:
+               huffman_decode(compressed, decoded, cache=None,
+                              stats=stats), True),
+    'decode_tree': (lambda text, encoded, compressed, decoded, stats:
+                    huffman_decode(compressed, decoded, 0, cache=None,
+                                   stats=stats), True),
+}
+
+
+def profile_case(case, size, profile='skewed'):
+    """ Measures the peak memory of one case on a fresh corpus
+        Args:
+            case(str): the name of the case in CASES
+            size(int): the number of characters of the corpus
+            profile(str): the entropy of the corpus, one of PROFILES
+        Returns:
+            dict: the record of the case, its corpus and the measurements
+                  of MemoryStats.as_dict, with 'ratio' the overall peak as
+                  a multiple of the size
+    """
+
+    func, needs_encoded = CASES[case]
+    with tempfile.TemporaryDirectory() as tmp:
+        text = os.path.join(tmp, 'corpus.txt')
+        encoded = os.path.join(tmp, 'corpus_enc.txt')
+        compressed = os.path.join(tmp, 'corpus_enc_compressed.txt')
+        decoded = os.path.join(tmp, 'corpus_dec.txt')
+        make_corpus(text, size, profile=profile)
+        if needs_encoded:
+            huffman_encode(text, encoded, False, cache=None)
+        with MemoryStats() as stats:
+            func(text, encoded, compressed, decoded, stats)
+    record = {'case': case, 'profile': profile, 'size': size}
+    record.update(stats.as_dict())
+    record['ratio'] = stats.peak / size if size else 0.0
+    return record
+
+
+def over_budget(records, budgets):
+    """ Finds the records whose peak memory is past their budget
+        Args:
+            records(list): records of profile_case
+            budgets(dict): case name -> the peak allowed as a multiple of
+                           the input size, cases without one are not checked
+        Returns:
+            list: the records over budget
+    """
+
+    return [record for record in records
+            if record['case'] in budgets
+            and record['peak'] > budgets[record['case']] * record['size']]
+
+
+def parse_budget(text):
+    """ Parses a budget of the command line
+        Args:
+            text(str): CASE=RATIO, e.g. 'encode=0.25'
+        Returns:
+            tuple: the case name and the ratio
+    """
+
+    case, sep, ratio = text.partition('=')
+    if not sep or case not in CASES:
+        raise argparse.ArgumentTypeError(
+            'budgets are CASE=RATIO with CASE one of ' + ', '.join(CASES))
+    return case, float(ratio)
+
+
+def main(argv):
+    """ Profiles the cases and prints the peaks
+        Args:
+            argv(list): command line arguments, the corpus sizes and options
+        Returns:
+            int: the exit status, 1 if a case went over its budget
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='huffman_memprof.py',
+        description='Peak memory of the Huffman coding pipeline')
+    parser.add_argument('sizes', nargs='*', type=parse_size,
+                        metavar='size', help='corpus sizes, default 256K 1M')
+    parser.add_argument('--case', action='append', choices=list(CASES),
+                        help='case to run, may be repeated, default all')
+    parser.add_argument('--profile', choices=PROFILES, default='skewed',
+                        help='corpus entropy, default skewed')
+    parser.add_argument('--budget', action='append', type=parse_budget,
+                        default=[], metavar='CASE=RATIO',
+                        help='peak allowed as a multiple of the size')
+    parser.add_argument('--json', metavar='FILE',
+                        help='append the records to FILE as JSON lines')
+    args = parser.parse_args(argv[1:])
+    sizes = args.sizes or [1 << 18, 1 << 20]
+    budgets = dict(args.budget)
+
+    records = []
+    for case in args.case or list(CASES):
+        for size in sizes:
+            record = profile_case(case, size, args.profile)
+            records.append(record)
+            print('{:12} {:>10} {:>12} {:8.3f}x  {}'.format(
+                case, size, record['peak'], record['ratio'],
+                ' '.join('{}={}'.format(name, peak)
+                         for name, peak in record['peaks'].items())))
+
+    if args.json:
+        with open(args.json, 'a') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+
+    failed = over_budget(records, budgets)
+    for record in failed:
+        print('{:12} {:>10} OVER BUDGET {:.3f}x > {}x'.format(
+            record['case'], record['size'], record['ratio'],
+            budgets[record['case']]))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,86 @@
+"""Vectorized bit packing for the Huffman Encoding of Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+HuffmanBitWriter.write_codes packs large blocks with NumPy when it is
+installed. The symbols are mapped through arrays of their codes, left
+aligned in 64 bits, and of their lengths. The cumulative sum of the
+lengths gives the bit offset of every code, which picks the 64 bit word
+the code starts in and the shift within it. As codes never overlap,
+the shifted codes of a word are summed with numpy.add.reduceat, and the
+bits spilling into the next word are added the same way. The words are
+written big-endian, giving the same bitstream as the pure Python loop,
+which is used without NumPy.
+"""
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+# blocks with fewer symbols are not worth the setup of the arrays
+MIN_SYMBOLS = 4096
+# codes must fit the 64 bit code array
+MAX_CODE_LEN = 64
+
+
+def code_arrays(codes):
+    """ Builds the lookup arrays of a code table
+        Args:
+            codes(list): (code, length) pairs indexed by symbol as built by
+                         create_code with as_int=True
+        Returns:
+            tuple: the codes shifted to the top of a uint64 and the lengths
+                   as int64 arrays, None without NumPy or with codes longer
+                   than MAX_CODE_LEN
+    """
+
+    if numpy is None or max(length for _, length in codes) > MAX_CODE_LEN:
+        return None
+    return (numpy.array([code << (MAX_CODE_LEN - length) if length else 0
+                         for code, length in codes], dtype=numpy.uint64),
+            numpy.array([length for _, length in codes], dtype=numpy.int64))
+
+
+def pack_codes(symbols, arrays, acc=0, n_bits=0):
+    """ Packs the codes of a block of symbols after the pending bits of a
+        writer
+        Args:
+            symbols(bytes-like): the symbols as bytes
+            arrays(tuple): the lookup arrays of code_arrays
+            acc(int): the pending bits, highest bit first
+            n_bits(int): the number of pending bits, less than 8
+        Returns:
+            tuple: the whole packed bytes, then the bits and the number of
+                   bits of the unfinished last byte
+    """
+
+    code_array, length_array = arrays
+    syms = numpy.frombuffer(symbols, dtype=numpy.uint8)
+    codes = code_array[syms]
+    lengths = length_array[syms]
+    ends = numpy.cumsum(lengths)
+    ends += n_bits
+    total = int(ends[-1]) if len(ends) else n_bits
+    starts = ends - lengths
+
+    word = starts >> 6
+    shift = (starts & 63).astype(numpy.uint64)
+    # the top of each code goes to its word, the rest to the next one,
+    # shifting by 1 first as a shift by 64 is undefined
+    high = codes >> shift
+    low = (codes << numpy.uint64(1)) << (numpy.uint64(63) - shift)
+    firsts = numpy.flatnonzero(numpy.diff(word, prepend=-1))
+    words = numpy.zeros(total // 64 + 2, dtype=numpy.uint64)
+    used = word[firsts]
+    words[used] = numpy.add.reduceat(high, firsts)
+    words[used + 1] |= numpy.add.reduceat(low, firsts)
+    if n_bits:
+        words[0] |= numpy.uint64(acc << (64 - n_bits))
+
+    n_whole = total // 8
+    rest = total - 8 * n_whole
+    packed = words.astype('>u8').tobytes()
+    acc = packed[n_whole] >> (8 - rest) if rest else 0
+    return packed[:n_whole], acc, rest
@@ -0,0 +1,438 @@
+"""Block-parallel Huffman Encoding for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+The input is cut into blocks of block_size bytes that are encoded
+independently with one shared canonical code table, so blocks can be
+encoded and decoded on separate cores. Layout of the container:
+
+    magic      4 bytes, b'HUFP'
+    flags      1 byte, FLAG_DENSE selects the layout of the lengths
+    count      varint, the number of symbols encoded
+    block_size varint, the number of symbols per block
+    lengths    the code length table, as in huffman_canonical
+    sizes      8 bytes per block, the number of bytes of its bitstream,
+               the top bit set for a stored block
+
+The bitstreams of the blocks follow in order, each padded to a whole byte.
+A block that the shared code would not shrink, such as a compressed
+attachment inside an archive, is stored as its raw bytes instead.
+
+huffman_encode_many and huffman_decode_many spread many files over the
+processes instead, grouping small files into one job.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from huffman_bit_reader import HuffmanBitReader, read_magic
+from huffman_bit_writer import HuffmanBitWriter
+from huffman_canonical import FLAG_DENSE, canonical_encode
+from huffman_canonical import code_lengths, canonical_codes, code_strings
+from huffman_canonical import lengths_layout, write_lengths, read_lengths
+from huffman_canonical import write_varint, read_varint
+from huffman_freq import byte_histogram
+from huffman_coding import huffman_decode
+from huffman_table import DecodeTable, DEFAULT_TABLE_BITS
+
+MAGIC = b'HUFP'
+BLOCK_SIZE = 1 << 20
+SIZE_BYTES = 8
+STORED_BLOCK = 1 << (8 * SIZE_BYTES - 1)
+BATCH_BYTES = 1 << 20
+SUFFIX = '.huf'
+
+
+class BatchResult:
+    """ Outcome of one file of a batch
+        Attributes:
+            path (str): the name of the input file
+            output (str): the name of the output file
+            error (str): why the file failed, None if it succeeded
+    """
+
+    def __init__(self, path, output, error=None):
+        """ Initialization implementation of object"""
+
+        self.path = path
+        self.output = output
+        self.error = error
+
+    def __repr__(self):
+        """ How the result represents itself"""
+
+        return 'BatchResult({!r}, {!r}, {!r})'.format(self.path, self.output,
+                                                      self.error)
+
+
+def huffman_encode_parallel(in_file, out_file, block_size=BLOCK_SIZE,
+                            workers=None):
+    """ Encodes the bytes of a file in independent blocks
+        Args:
+            in_file(str): the name of file being read into
+            out_file(str): the name of the compressed file
+            block_size(int): the number of bytes per block
+            workers(int): the number of processes, None for one per CPU and
+                          1 to run in this process
+        Returns:
+            None
+    """
+
+    file_size = os.path.getsize(in_file)
+    blocks = [(in_file, offset, block_size)
+              for offset in range(0, file_size, block_size)]
+
+    with _executor(workers) as executor:
+        freq_list = [0] * 256
+        for counts in executor.map(count_block, blocks):
+            freq_list = [total + count
+                         for total, count in zip(freq_list, counts)]
+        lengths = code_lengths(freq_list)
+        codes = canonical_codes(lengths)
+
+        header = io.BytesIO()
+        writer = HuffmanBitWriter(header)
+        flags = lengths_layout(lengths)
+        writer.write_bits(int.from_bytes(MAGIC, 'big'), 8 * len(MAGIC))
+        writer.write_bits(flags, 8)
+        write_varint(writer, sum(freq_list))
+        write_varint(writer, block_size)
+        write_lengths(writer, lengths, flags)
+        writer.close()
+
+        with open(out_file, 'wb') as comp_file:
+            comp_file.write(header.getvalue())
+            sizes_offset = comp_file.tell()
+            comp_file.write(bytes(SIZE_BYTES * len(blocks)))
+            sizes = []
+            jobs = [block + (codes,) for block in blocks]
+            for payload, stored in executor.map(encode_block, jobs):
+                comp_file.write(payload)
+                sizes.append(len(payload) | (STORED_BLOCK if stored else 0))
+            comp_file.seek(sizes_offset)
+            comp_file.write(b''.join(size.to_bytes(SIZE_BYTES, 'big')
+                                     for size in sizes))
+
+
+def huffman_decode_parallel(encoded_file, decode_file, workers=None,
+                            table_bits=DEFAULT_TABLE_BITS):
+    """ Decodes a file of huffman_encode_parallel, blocks in parallel
+        Args:
+            encoded_file(str): name of the encoded file
+            decode_file(str): desired name of output file
+            workers(int): the number of processes, None for one per CPU and
+                          1 to run in this process
+            table_bits(int): the number of bits resolved per table lookup
+        Returns:
+            None
+    """
+
+    with open(decode_file, 'wb') as decoded_file:
+        for data in iter_parallel_decode(encoded_file, workers, table_bits):
+            decoded_file.write(data)
+
+
+def iter_parallel_decode(encoded_file, workers=1,
+                         table_bits=DEFAULT_TABLE_BITS):
+    """ Decodes a parallel container lazily, one block at a time
+        Args:
+            encoded_file(str): name of the encoded file
+            workers(int): the number of processes, None for one per CPU and
+                          1 to run in this process
+            table_bits(int): the number of bits resolved per table lookup
+        Returns:
+            generator: yields the decoded blocks as bytes, in order
+    """
+
+    count, block_size, lengths, blocks = read_container(encoded_file)
+    jobs = []
+    for idx, (offset, size, stored) in enumerate(blocks):
+        n_symbols = min(block_size, count - idx * block_size)
+        jobs.append((encoded_file, offset, size, stored, n_symbols,
+                     tuple(lengths), table_bits))
+    with _executor(workers) as executor:
+        yield from executor.map(decode_block, jobs)
+
+
+def read_container(encoded_file):
+    """ Reads the header and block table of a parallel container
+        Args:
+            encoded_file(str): name of the encoded file
+        Returns:
+            tuple: number of symbols, block size, list of 256 code lengths
+                   and list of (offset, size, stored) of the blocks
+        Raises:
+            ValueError: if the file is not a parallel container
+    """
+
+    reader = HuffmanBitReader(encoded_file)
+    try:
+        if reader.read_bits(8 * len(MAGIC)) != int.from_bytes(MAGIC, 'big'):
+            raise ValueError('not a parallel Huffman file')
+        flags = reader.read_bits(8)
+        if flags & ~FLAG_DENSE:
+            raise ValueError('unknown header flags {:#x}'.format(flags))
+        count = read_varint(reader)
+        block_size = read_varint(reader)
+        lengths = read_lengths(reader, flags)
+        n_blocks = -(-count // block_size) if block_size else 0
+        sizes = [reader.read_bits(8 * SIZE_BYTES) for _ in range(n_blocks)]
+        offset = reader.tell()
+    except EOFError:
+        raise ValueError('parallel Huffman header is truncated')
+    finally:
+        reader.close()
+
+    blocks = []
+    for size in sizes:
+        stored = bool(size & STORED_BLOCK)
+        size &= ~STORED_BLOCK
+        blocks.append((offset, size, stored))
+        offset += size
+    return count, block_size, lengths, blocks
+
+
+def is_parallel(encoded_file):
+    """ Checks whether a file is a parallel container
+        Args:
+            encoded_file(str): name of the encoded file
+        Returns:
+            bool: True for files of huffman_encode_parallel
+    """
+
+    return read_magic(encoded_file) == MAGIC
+
+
+def huffman_encode_many(paths, out_dir, workers=None,
+                        batch_bytes=BATCH_BYTES):
+    """ Encodes many files with canonical_encode, spread over processes.
+        Files that coding would not shrink are stored raw. A file that
+        fails does not stop the others.
+        Args:
+            paths(list): the names of the files to be encoded
+            out_dir(str): the directory of the compressed files, created if
+                          missing, the files are named after their input
+                          with SUFFIX appended
+            workers(int): the number of processes, None for one per CPU and
+                          1 to run in this process
+            batch_bytes(int): files are grouped into jobs of about this many
+                              bytes, so small files share one job
+        Returns:
+            list: a BatchResult per path, in order
+    """
+
+    os.makedirs(out_dir or os.curdir, exist_ok=True)
+    jobs = [(path, os.path.join(out_dir, os.path.basename(path) + SUFFIX))
+            for path in paths]
+    return _run_many(encode_files, jobs, workers, batch_bytes)
+
+
+def huffman_decode_many(paths, out_dir, workers=None,
+                        batch_bytes=BATCH_BYTES):
+    """ Decodes many files with huffman_decode, spread over processes.
+        A file that fails does not stop the others.
+        Args:
+            paths(list): the names of the files to be decoded
+            out_dir(str): the directory of the decoded files, created if
+                          missing, the files are named after their input
+                          without SUFFIX, or with '.out' appended if it
+                          has none
+            workers(int): the number of processes, None for one per CPU and
+                          1 to run in this process
+            batch_bytes(int): files are grouped into jobs of about this many
+                              bytes, so small files share one job
+        Returns:
+            list: a BatchResult per path, in order
+    """
+
+    os.makedirs(out_dir or os.curdir, exist_ok=True)
+    jobs = []
+    for path in paths:
+        name = os.path.basename(path)
+        if name.endswith(SUFFIX):
+            name = name[:-len(SUFFIX)]
+        else:
+            name += '.out'
+        jobs.append((path, os.path.join(out_dir, name)))
+    return _run_many(decode_files, jobs, workers, batch_bytes)
+
+
+def _run_many(func, jobs, workers, batch_bytes):
+    """ Groups (path, output) jobs by size and runs func over the groups
+        Args:
+            func(callable): encode_files or decode_files
+            jobs(list): (path, output) pairs
+            workers(int): the number of processes
+            batch_bytes(int): the number of input bytes per group
+        Returns:
+            list: a BatchResult per job, in order
+    """
+
+    results = [None] * len(jobs)
+    batches = []
+    batch = []
+    size = 0
+    outputs = set()
+    for idx, (path, output) in enumerate(jobs):
+        if output in outputs:
+            results[idx] = BatchResult(path, output,
+                                       'output name taken by another file')
+            continue
+        outputs.add(output)
+        try:
+            size += os.path.getsize(path)
+        except OSError as error:
+            results[idx] = BatchResult(path, output, str(error))
+            continue
+        batch.append((idx, path, output))
+        if size >= batch_bytes:
+            batches.append(batch)
+            batch = []
+            size = 0
+    if batch:
+        batches.append(batch)
+
+    with _executor(workers) as executor:
+        for done in executor.map(func, batches):
+            for idx, result in done:
+                results[idx] = result
+    return results
+
+
+def encode_files(batch):
+    """ Encodes a group of files, run by the workers
+        Args:
+            batch(list): (index, path, output) of every file
+        Returns:
+            list: (index, BatchResult) of every file
+    """
+
+    return [(idx, _run_one(_encode_binary, path, output))
+            for idx, path, output in batch]
+
+
+def decode_files(batch):
+    """ Decodes a group of files, run by the workers
+        Args:
+            batch(list): (index, path, output) of every file
+        Returns:
+            list: (index, BatchResult) of every file
+    """
+
+    return [(idx, _run_one(_decode_binary, path, output))
+            for idx, path, output in batch]
+
+
+def _encode_binary(path, output):
+    """ Encodes a file into the canonical format, or stores it raw when
+    coding would not make it smaller"""
+
+    canonical_encode(path, output, allow_stored=True)
+
+
+def _decode_binary(path, output):
+    """ Decodes a file of any format into raw bytes"""
+
+    huffman_decode(path, output, binary=True)
+
+
+def _run_one(func, path, output):
+    """ Runs func(path, output), turning an exception into an error"""
+
+    try:
+        func(path, output)
+    except Exception as error:  # one bad file must not stop the batch
+        return BatchResult(path, output,
+                           '{}: {}'.format(type(error).__name__, error))
+    return BatchResult(path, output)
+
+
+def count_block(job):
+    """ Counts the byte values of one block, run by the workers
+        Args:
+            job(tuple): file name, offset and size of the block
+        Returns:
+            list: 256 item list with the count of every byte value
+    """
+
+    in_file, offset, size = job
+    with open(in_file, 'rb') as file:
+        file.seek(offset)
+        return byte_histogram([file.read(size)])
+
+
+def encode_block(job):
+    """ Encodes one block, run by the workers
+        Args:
+            job(tuple): file name, offset and size of the block and the
+                        (code, length) pairs of the symbols
+        Returns:
+            tuple: the bitstream of the block padded to a whole byte, or the
+                   raw block when that is not smaller, and whether the block
+                   is stored
+    """
+
+    in_file, offset, size, codes = job
+    with open(in_file, 'rb') as file:
+        file.seek(offset)
+        data = file.read(size)
+    out = io.BytesIO()
+    writer = HuffmanBitWriter(out)
+    writer.write_codes(data, codes)
+    writer.close()
+    payload = out.getvalue()
+    if len(payload) >= len(data):
+        return data, True
+    return payload, False
+
+
+_TABLES = {}
+
+def decode_block(job):
+    """ Decodes one block, run by the workers
+        Args:
+            job(tuple): file name, offset and size of the bitstream,
+                        whether the block is stored, the number of symbols,
+                        the code lengths and table bits
+        Returns:
+            bytes: the decoded block
+    """
+
+    encoded_file, offset, size, stored, n_symbols, lengths, table_bits = job
+    with open(encoded_file, 'rb') as file:
+        file.seek(offset)
+        data = file.read(size)
+    if stored:
+        return data
+    key = (lengths, table_bits)
+    if key not in _TABLES:
+        # every block of a file shares its table, build it once per process
+        _TABLES.clear()
+        _TABLES[key] = DecodeTable(code_strings(canonical_codes(lengths)),
+                                   max(table_bits, 1))
+    return b''.join(_TABLES[key].decode([data], count=n_symbols))
+
+
+class _InlineExecutor:
+    """ Stand-in for ProcessPoolExecutor that runs jobs in this process"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @staticmethod
+    def map(func, jobs):
+        """ Runs func over jobs lazily, in order"""
+        return map(func, jobs)
+
+
+def _executor(workers):
+    """ Returns a process pool, or an inline executor for one worker"""
+
+    if workers == 1:
+        return _InlineExecutor()
+    return ProcessPoolExecutor(workers)
@@ -0,0 +1,176 @@
+"""Pretrained Huffman code tables for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+A code table is trained once from a corpus and shared by the senders and
+receivers of small messages, which then carry a table ID instead of a
+header. Besides the 256 byte values the table has an ESCAPE symbol: a byte
+unseen during training is written as the ESCAPE code followed by its 8
+bits. Layout of a message:
+
+    table_id   varint, the ID of the table the message was encoded with
+    count      varint, the number of bytes encoded
+    codes      the bitstream, padded with 0s to a whole byte
+
+Layout of a table file:
+
+    magic      4 bytes, b'HUFT'
+    table_id   varint
+    lengths    257 bytes, the code length of every byte value and ESCAPE
+"""
+
+import io
+
+from huffman_bit_reader import HuffmanBitReader
+from huffman_bit_writer import HuffmanBitWriter
+from huffman_canonical import limited_code_lengths, canonical_codes
+from huffman_canonical import code_strings, write_varint, read_varint
+from huffman_coding import read_chunks
+from huffman_freq import byte_histogram
+from huffman_table import DecodeTable, DEFAULT_TABLE_BITS
+
+MAGIC = b'HUFT'
+ESCAPE = 256
+ESCAPE_BITS = 8
+MAX_CODE_LEN = 15
+
+
+class PretrainedTable:
+    """ A trained code table
+        Attributes:
+            table_id (int): the ID written in the messages
+            lengths (list): 257 code lengths, indexed by byte value and
+                            ESCAPE
+            codes (list): 256 (code, length) pairs, the codes of unseen
+                          bytes are ESCAPE codes followed by their 8 bits
+            table (DecodeTable): the decode table of codes
+    """
+
+    def __init__(self, table_id, lengths, table_bits=DEFAULT_TABLE_BITS):
+        """ Derives the codes and decode table of the lengths
+            Args:
+                table_id(int): the ID written in the messages
+                lengths(list): 257 code lengths, ESCAPE must have a code
+                table_bits(int): the number of bits resolved per table
+                                 lookup
+            Raises:
+                ValueError: if the lengths are not a prefix code with an
+                            ESCAPE code
+        """
+
+        if len(lengths) != ESCAPE + 1 or not lengths[ESCAPE]:
+            raise ValueError('table needs 257 code lengths with an ESCAPE')
+        self.table_id = table_id
+        self.lengths = list(lengths)
+        codes = canonical_codes(self.lengths)
+        esc_code, esc_length = codes[ESCAPE]
+        self.codes = [code if code[1] else
+                      ((esc_code << ESCAPE_BITS) | sym,
+                       esc_length + ESCAPE_BITS)
+                      for sym, code in enumerate(codes[:ESCAPE])]
+        self.table = DecodeTable(code_strings(self.codes), table_bits)
+
+
+def train_table(filenames, table_id, max_code_len=MAX_CODE_LEN):
+    """ Trains a table on the bytes of a corpus of files
+        Args:
+            filenames(iterable): the names of the files of the corpus
+            table_id(int): the ID written in the messages
+            max_code_len(int): the longest code allowed, which bounds the
+                               size of the decode table
+        Returns:
+            PretrainedTable: the trained table
+    """
+
+    freq_list = [0] * 256
+    for name in filenames:
+        freq_list = [total + count for total, count
+                     in zip(freq_list, byte_histogram(
+                         read_chunks(name, binary=True)))]
+    # ESCAPE is counted once, as if one byte of the corpus was unseen
+    return PretrainedTable(table_id,
+                           limited_code_lengths(freq_list + [1],
+                                                max_code_len))
+
+
+def save_table(table, filename):
+    """ Writes a table to a file
+        Args:
+            table(PretrainedTable): the table to be written
+            filename(str): the name of the table file
+    """
+
+    writer = HuffmanBitWriter(filename)
+    writer.write_bits(int.from_bytes(MAGIC, 'big'), 8 * len(MAGIC))
+    write_varint(writer, table.table_id)
+    for length in table.lengths:
+        writer.write_bits(length, 8)
+    writer.close()
+
+
+def load_table(filename, table_bits=DEFAULT_TABLE_BITS):
+    """ Reads a table written by save_table
+        Args:
+            filename(str): the name of the table file
+            table_bits(int): the number of bits resolved per table lookup
+        Returns:
+            PretrainedTable: the table
+        Raises:
+            ValueError: if the file does not hold a valid table
+    """
+
+    reader = HuffmanBitReader(filename)
+    try:
+        if reader.read_bits(8 * len(MAGIC)) != int.from_bytes(MAGIC, 'big'):
+            raise ValueError('not a Huffman table file')
+        table_id = read_varint(reader)
+        lengths = [reader.read_bits(8) for _ in range(ESCAPE + 1)]
+    except EOFError:
+        raise ValueError('Huffman table file is truncated')
+    finally:
+        reader.close()
+    return PretrainedTable(table_id, lengths, table_bits)
+
+
+def encode_message(data, table):
+    """ Encodes a message with a pretrained table
+        Args:
+            data(bytes-like): the message
+            table(PretrainedTable): the table shared with the receiver
+        Returns:
+            bytes: the encoded message
+    """
+
+    data = memoryview(data).cast('B')
+    out = io.BytesIO()
+    writer = HuffmanBitWriter(out)
+    write_varint(writer, table.table_id)
+    write_varint(writer, len(data))
+    writer.write_codes(data, table.codes)
+    writer.close()
+    return out.getvalue()
+
+
+def decode_message(buf, tables):
+    """ Decodes a message of encode_message
+        Args:
+            buf(bytes-like): the encoded message
+            tables(dict): the known tables by table ID
+        Returns:
+            bytes: the message
+        Raises:
+            ValueError: if the table ID is unknown or the message is
+                        truncated
+    """
+
+    reader = HuffmanBitReader(io.BytesIO(buf))
+    try:
+        table_id = read_varint(reader)
+        count = read_varint(reader)
+    except EOFError:
+        raise ValueError('message header is truncated')
+    if table_id not in tables:
+        raise ValueError('unknown table ID {}'.format(table_id))
+    return b''.join(tables[table_id].table.decode(reader.iter_bytes(),
+                                                  count=count))
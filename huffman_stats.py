@@ -0,0 +1,231 @@
+"""Instrumentation of the Huffman Encoding for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+A Stats object passed to huffman_encode or huffman_decode collects the
+wall time of every stage and the sizes of the data. Without one the
+coders only pay for a few None checks per chunk. A MemoryStats object
+also records the peak memory allocated in every stage.
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+_NO_STAGE = nullcontext()
+_DONE = object()
+
+
+class Stats:
+    """ Measurements of one encode or decode
+        Attributes:
+            operation (str): 'encode' or 'decode'
+            stages (dict): stage name -> wall time in seconds, in the order
+                           the stages first ran
+            bytes_in (int): the number of bytes read
+            bytes_out (int): the number of bytes written
+            symbols (int): the number of symbols coded
+            header_bytes (int): the size of the header of the compressed
+                                file, None if not known
+            tree_depth (int): the length of the longest code, None if not
+                              known
+            cache_hit (bool): whether the code tables came from the cache,
+                              None if no cache was consulted
+            reads (int): the number of blocks read from the input
+            flushes (int): the number of buffer writes to the output
+    """
+
+    def __init__(self):
+        """ Initialization implementation of object"""
+
+        self.operation = None
+        self.stages = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.symbols = 0
+        self.header_bytes = None
+        self.tree_depth = None
+        self.cache_hit = None
+        self.reads = 0
+        self.flushes = 0
+
+    @contextmanager
+    def stage(self, name):
+        """ Adds the wall time of the with block to a stage
+            Args:
+                name(str): the name of the stage
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        """ Adds wall time to a stage
+            Args:
+                name(str): the name of the stage
+                seconds(float): the time spent
+        """
+
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def bits_per_symbol(self):
+        """ Returns the number of compressed bits per symbol, headers
+            excluded
+            Returns:
+                float: the bits per symbol, None without symbols
+        """
+
+        if not self.symbols:
+            return None
+        compressed = self.bytes_out if self.operation == 'encode' \
+            else self.bytes_in
+        return 8 * (compressed - (self.header_bytes or 0)) / self.symbols
+
+    def as_dict(self):
+        """ Returns the measurements
+            Returns:
+                dict: the attributes, the total time and bits per symbol
+        """
+
+        return {'operation': self.operation, 'stages': dict(self.stages),
+                'seconds': sum(self.stages.values()),
+                'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out,
+                'symbols': self.symbols, 'header_bytes': self.header_bytes,
+                'bits_per_symbol': self.bits_per_symbol(),
+                'tree_depth': self.tree_depth, 'cache_hit': self.cache_hit,
+                'reads': self.reads, 'flushes': self.flushes}
+
+    def to_json(self):
+        """ Returns the measurements as one JSON line
+            Returns:
+                str: the JSON object of as_dict, without a newline
+        """
+
+        return json.dumps(self.as_dict())
+
+
+class MemoryStats(Stats):
+    """ Stats that also record the peak of the memory allocated by Python
+        in every stage, traced with tracemalloc. Memory maps and buffers of
+        C libraries are not seen. Use it as a context manager around the
+        encode or decode measured.
+        Attributes:
+            peaks (dict): stage name -> the highest memory allocated while
+                          the stage ran, in bytes above that of the start
+            peak (int): the highest memory allocated over the whole run,
+                        in bytes above that of the start
+    """
+
+    def __init__(self):
+        """ Initialization implementation of object"""
+
+        super().__init__()
+        self.peaks = {}
+        self.peak = 0
+        self._base = 0
+        self._open = []
+        self._owner = False
+
+    def __enter__(self):
+        """ Starts tracing, unless it runs already"""
+
+        self._owner = not tracemalloc.is_tracing()
+        if self._owner:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        """ Records the last peak and stops the tracing it started"""
+
+        self._record()
+        if self._owner:
+            tracemalloc.stop()
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """ Adds the wall time of the with block to a stage and records the
+            peak memory allocated in the block, nested stages included
+            Args:
+                name(str): the name of the stage
+        """
+
+        self._record()
+        self._open.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+            self._record()
+            self._open.pop()
+
+    def _record(self):
+        """ Charges the peak since the last record to the open stages"""
+
+        if not tracemalloc.is_tracing():
+            return
+        peak = max(tracemalloc.get_traced_memory()[1] - self._base, 0)
+        tracemalloc.reset_peak()
+        self.peak = max(self.peak, peak)
+        for name in self._open:
+            self.peaks[name] = max(self.peaks.get(name, 0), peak)
+
+    def as_dict(self):
+        """ Returns the measurements
+            Returns:
+                dict: those of Stats.as_dict, the peak of every stage and
+                      the overall peak
+        """
+
+        record = super().as_dict()
+        record['peaks'] = dict(self.peaks)
+        record['peak'] = self.peak
+        return record
+
+
+def stage_timer(stats):
+    """ Returns the stage method of stats, or a no-op stand-in
+        Args:
+            stats(Stats): the stats being collected, or None
+        Returns:
+            callable: takes a stage name, returns a context manager
+    """
+
+    if stats is None:
+        return lambda name: _NO_STAGE
+    return stats.stage
+
+
+def timed_iter(iterable, stats, name):
+    """ Adds the time spent producing the items of iterable to a stage
+        Args:
+            iterable(iterable): e.g. a generator decoding data
+            stats(Stats): the stats being collected, or None
+            name(str): the name of the stage
+        Returns:
+            iterable: iterable itself without stats, else a generator of
+                      its items
+    """
+
+    if stats is None:
+        return iterable
+    return _timed_iter(iter(iterable), stats, name)
+
+
+def _timed_iter(iterator, stats, name):
+    """ Generator of timed_iter"""
+
+    while True:
+        with stats.stage(name):
+            item = next(iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
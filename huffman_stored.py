@@ -0,0 +1,123 @@
+"""Stored files and compressibility estimation for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+
+Data that Huffman coding cannot shrink, such as already compressed
+attachments, is better kept as it is. The size of the coded output is
+known before encoding: the histogram and the code lengths give the
+number of bits exactly, and the entropy of the histogram bounds it from
+below without building any code. Encoders compare it to the size of a
+stored file and write the data raw when coding would not pay. Layout of
+a stored file:
+
+    magic      4 bytes, b'HUFS'
+    data       the bytes of the input, unchanged
+"""
+
+import math
+
+from huffman_bit_reader import read_magic
+
+MAGIC = b'HUFS'
+CHUNK_SIZE = 1 << 16
+
+
+def entropy_bits(list_of_freqs):
+    """ Returns the Shannon entropy of a histogram, a lower bound of the
+        number of bits of any prefix code of the data
+        Args:
+            list_of_freqs(list): the count of every symbol
+        Returns:
+            float: the total number of bits
+    """
+
+    total = sum(list_of_freqs)
+    return sum(freq * math.log2(total / freq)
+               for freq in list_of_freqs if freq)
+
+
+def coded_bits(list_of_freqs, int_codes):
+    """ Returns the number of bits the codes give the data of a histogram
+        Args:
+            list_of_freqs(list): the count of every symbol
+            int_codes(list): (code, length) pairs indexed by symbol
+        Returns:
+            int: the total number of bits of the bitstream
+    """
+
+    return sum(freq * length
+               for freq, (_, length) in zip(list_of_freqs, int_codes))
+
+
+def coded_size(header_bytes, n_bits):
+    """ Returns the size of a compressed file
+        Args:
+            header_bytes(int): the size of the header
+            n_bits(float): the number of bits of the bitstream
+        Returns:
+            int: the number of bytes, the bitstream padded to a whole byte
+    """
+
+    return header_bytes + math.ceil(n_bits / 8)
+
+
+def stored_size(n_bytes):
+    """ Returns the size of the stored file of some data
+        Args:
+            n_bytes(int): the size of the data
+        Returns:
+            int: the number of bytes of the stored file
+    """
+
+    return len(MAGIC) + n_bytes
+
+
+def write_stored(chunks, out_file):
+    """ Writes a stored file
+        Args:
+            chunks(iterable): the data as bytes-like pieces
+            out_file(str): the name of the stored file
+        Returns:
+            int: the number of bytes of data written
+    """
+
+    n_bytes = 0
+    with open(out_file, 'wb') as file:
+        file.write(MAGIC)
+        for chunk in chunks:
+            file.write(chunk)
+            n_bytes += len(chunk)
+    return n_bytes
+
+
+def iter_stored_decode(encoded_file, chunk_size=CHUNK_SIZE):
+    """ Reads the data of a stored file, one piece at a time
+        Args:
+            encoded_file(str): name of the stored file
+            chunk_size(int): the number of bytes per piece
+        Returns:
+            generator: yields the data as bytes pieces
+        Raises:
+            ValueError: if the file is not a stored file
+    """
+
+    with open(encoded_file, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('not a stored Huffman file')
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def is_stored(encoded_file):
+    """ Checks whether a file is a stored file
+        Args:
+            encoded_file(str): name of the encoded file
+        Returns:
+            bool: True for files written by write_stored
+    """
+
+    return read_magic(encoded_file) == MAGIC
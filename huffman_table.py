@@ -0,0 +1,270 @@
+"""Table-driven Huffman decoder for Project 3
+Course: CPE202
+Quarter: Spring 2020
+Author: Chris Linthacum
+"""
+
+import itertools
+
+DEFAULT_TABLE_BITS = 10
+
+
+class DecodeTable:
+    """ Lookup tables that resolve up to `bits` bits of code per step
+        Attributes:
+            bits (int): the number of bits indexing the primary table
+            max_len (int): the length of the longest code
+            symbols (list): primary table, the symbol of every entry or the
+                            index of its secondary table
+            lengths (list): primary table, the code length of every entry,
+                            0 for a secondary table and -1 for no code
+            subtables (list): secondary tables for codes longer than bits,
+                              as (bits, symbols, lengths) tuples of at most
+                              bits bits each, an entry of length 0 giving
+                              the index of the next table
+    """
+
+    def __init__(self, codes, bits=DEFAULT_TABLE_BITS):
+        """ Builds the tables from a code list
+            Args:
+                codes(list): 256 strings of '0's and '1's as built by
+                             create_code, '' for unused symbols
+                bits(int): the maximum number of bits of the primary table
+        """
+
+        used = [(sym, code) for sym, code in enumerate(codes) if code]
+        self.max_len = max([len(code) for _, code in used], default=0)
+        self.bits = min(bits, self.max_len)
+        self.symbols = [0] * (1 << self.bits)
+        self.lengths = [-1] * (1 << self.bits)
+        self.subtables = []
+
+        long_codes = {}
+        for sym, code in used:
+            length = len(code)
+            if length <= self.bits:
+                fill_entries(self.symbols, self.lengths, self.bits,
+                             int(code, 2), length, sym)
+            else:
+                prefix = int(code[:self.bits], 2)
+                long_codes.setdefault(prefix, []).append((sym, code))
+
+        for prefix, group in sorted(long_codes.items()):
+            self.symbols[prefix] = self._add_subtable(group, self.bits)
+            self.lengths[prefix] = 0
+
+    def _add_subtable(self, group, consumed):
+        """ Builds the secondary tables of codes sharing their first bits.
+            Each level resolves at most self.bits more bits, so a long code
+            costs a chain of small tables instead of one table as large as
+            2 to the power of its length.
+            Args:
+                group(list): (symbol, code) pairs of the codes
+                consumed(int): the number of bits resolved by the tables
+                               before this one
+            Returns:
+                int: the index of the table in subtables
+        """
+
+        sub_bits = min(self.bits,
+                       max(len(code) for _, code in group) - consumed)
+        sub_symbols = [0] * (1 << sub_bits)
+        sub_lengths = [-1] * (1 << sub_bits)
+        index = len(self.subtables)
+        self.subtables.append((sub_bits, sub_symbols, sub_lengths))
+
+        long_codes = {}
+        for sym, code in group:
+            rest = code[consumed:]
+            if len(rest) <= sub_bits:
+                fill_entries(sub_symbols, sub_lengths, sub_bits,
+                             int(rest, 2), len(rest), sym, len(code))
+            else:
+                prefix = int(rest[:sub_bits], 2)
+                long_codes.setdefault(prefix, []).append((sym, code))
+
+        for prefix, longer in sorted(long_codes.items()):
+            sub_symbols[prefix] = self._add_subtable(longer,
+                                                     consumed + sub_bits)
+            sub_lengths[prefix] = 0
+        return index
+
+    def decode(self, chunks, count=None, eof=None, skip=0):
+        """ Decodes a bitstream into symbols, one input chunk at a time
+            Args:
+                chunks(iterable): bytes-like objects holding the bitstream
+                count(int): the number of symbols to decode, None to stop at
+                            eof only
+                eof(int): the symbol that ends the stream, it is not
+                          part of the output
+                skip(int): the number of bits before the bitstream starts in
+                           the first byte
+            Yields:
+                bytes: the symbols decoded from each chunk
+            Raises:
+                ValueError: if the bitstream ends before the last symbol
+        """
+
+        decoder = TableDecoder(self, count, eof)
+        if skip:
+            chunks = iter(chunks)
+            for first in chunks:
+                if len(first):
+                    decoder.n_bits = 8 - skip
+                    decoder.acc = first[0] & ((1 << decoder.n_bits) - 1)
+                    chunks = itertools.chain([first[1:]], chunks)
+                    break
+
+        for chunk in chunks:
+            if decoder.done:
+                return
+            out = decoder.feed(chunk)
+            if out:
+                yield out
+        out = decoder.finish()
+        if out:
+            yield out
+
+
+class TableDecoder:
+    """ Decodes a bitstream fed one chunk at a time with a DecodeTable, for
+        callers that get the data pushed to them
+        Attributes:
+            table (DecodeTable): the tables of the codes
+            count (int): the number of symbols left, -1 to stop at eof only
+            eof (int): the symbol that ends the stream, None for none
+            done (bool): whether the last symbol was decoded
+            acc (int): bit accumulator, its low n_bits bits are unconsumed
+            n_bits (int): the number of bits held in acc
+    """
+
+    def __init__(self, table, count=None, eof=None):
+        """ Initialization implementation of object
+            Raises:
+                ValueError: if symbols are wanted from a table without codes
+        """
+
+        self.table = table
+        self.count = -1 if count is None else count
+        self.eof = eof
+        self.done = self.count == 0
+        self.acc = 0
+        self.n_bits = 0
+        if table.max_len == 0:
+            if self.count > 0:
+                raise ValueError('no codes to decode the bitstream with')
+            self.done = True
+
+    def feed(self, chunk):
+        """ Decodes the symbols whose codes are complete after chunk
+            Args:
+                chunk(bytes-like): the next piece of the bitstream
+            Returns:
+                bytes: the symbols decoded
+            Raises:
+                ValueError: if the bitstream holds an invalid code
+        """
+
+        if self.done or not len(chunk):
+            return b''
+        return self._run(chunk, 0)
+
+    def finish(self):
+        """ Decodes the symbols left at the end of the bitstream, its last
+            bits padded with 0s
+            Returns:
+                bytes: the symbols decoded
+            Raises:
+                ValueError: if the bitstream ends before the last symbol
+        """
+
+        if self.done:
+            return b''
+        need = self.table.max_len
+        self.acc <<= need
+        self.n_bits += need
+        out = self._run(b'', need)
+        if not self.done:
+            raise ValueError('bitstream ended in the middle of the data')
+        return out
+
+    def _run(self, chunk, padding):
+        """ Decodes chunk after the bits held, the last padding bits held
+            being no part of the bitstream
+        """
+
+        table = self.table
+        bits = table.bits
+        mask = (1 << bits) - 1
+        need = table.max_len
+        symbols = table.symbols
+        lengths = table.lengths
+        subtables = table.subtables
+        eof = self.eof
+        count = self.count
+        acc = self.acc
+        n_bits = self.n_bits
+        pos = 0
+        size = len(chunk)
+        out = []
+        while count:
+            if n_bits < need:
+                if pos >= size:
+                    break
+                block = chunk[pos:pos + 8]
+                pos += 8
+                acc = ((acc & ((1 << n_bits) - 1)) << (8 * len(block))) \
+                    | int.from_bytes(block, 'big')
+                n_bits += 8 * len(block)
+                continue
+            idx = (acc >> (n_bits - bits)) & mask
+            length = lengths[idx]
+            if length > 0:
+                sym = symbols[idx]
+            else:
+                sub_syms = symbols
+                sub_lens = lengths
+                used = bits
+                while not length:
+                    sub_bits, sub_syms, sub_lens = subtables[sub_syms[idx]]
+                    used += sub_bits
+                    idx = (acc >> (n_bits - used)) & ((1 << sub_bits) - 1)
+                    length = sub_lens[idx]
+                if length < 0:
+                    raise ValueError('invalid code in bitstream')
+                sym = sub_syms[idx]
+            n_bits -= length
+            if n_bits < padding:
+                raise ValueError('bitstream ended in the middle of the data')
+            if sym == eof:
+                count = 0
+                break
+            out.append(sym)
+            count -= 1
+        self.count = count
+        self.acc = acc
+        self.n_bits = n_bits
+        self.done = not count
+        return bytes(out)
+
+
+def fill_entries(symbols, lengths, bits, code, length, sym, total=None):
+    """ Fills every table entry whose index starts with the given code
+        Args:
+            symbols(list): the symbol entries of the table
+            lengths(list): the length entries of the table
+            bits(int): the number of bits indexing the table
+            code(int): the code as an integer
+            length(int): the number of bits of code
+            sym(int): the symbol of the code
+            total(int): the length stored in the entries, defaults to length
+    """
+
+    if total is None:
+        total = length
+    shift = bits - length
+    start = code << shift
+    for idx in range(start, start + (1 << shift)):
+        symbols[idx] = sym
+        lengths[idx] = total
+
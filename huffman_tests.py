@@ -6,6 +6,14 @@ Author: Chris Linthacum
 
 import unittest as ut
 import filecmp
+import io
+import json
+import os
+import socket
+import asyncio
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 from min_pq import MinPQ
 
@@ -15,8 +23,34 @@ from huffman_coding import create_code
 from huffman_coding import create_header
 from huffman_coding import huffman_encode
 from huffman_coding import huffman_decode
+from huffman_coding import encode_text
+from huffman_coding import iter_decode
+from huffman_coding import iter_tree_decode
+from huffman_coding import create_huff_tree_linear
+from huffman_coding import code_lengths_in_place
+from huffman_coding import create_flat_tree
+from huffman_coding import map_chunks
+from huffman_coding import read_chunks
 
-from huffman import HuffmanNode
+from huffman_table import DecodeTable
+
+import huffman_freq
+import huffman_canonical
+import huffman_parallel
+import huffman_memory
+import huffman_adaptive
+import huffman_pretrained
+from huffman_cache import LRUCache
+import huffman_async
+import huffman_bench
+import huffman_memprof
+import huffman_pack
+import huffman_stored
+from huffman_stats import Stats, MemoryStats
+
+from huffman import HuffmanNode, FlatHuffmanTree
+from huffman_bit_reader import HuffmanBitReader
+from huffman_bit_writer import HuffmanBitWriter
 
 class TestHuffmanNode(ut.TestCase):
     """ Tests the HuffmanNode class"""
@@ -139,6 +173,1102 @@ class TestList(ut.TestCase):
         # with a *known* solution file
         self.assertTrue(filecmp.cmp("decodetest3.txt", "file3.txt"))
 
+class LinearTreeTests(ut.TestCase):
+    """ Tests the two-queue tree builder and in-place code lengths"""
+
+    def test_same_codes(self):
+        """ Tests that both builders break ties the same way"""
+        for name in ("file1.txt", "file2.txt", "file3.txt"):
+            freqlist = cnt_freq(name)
+            self.assertEqual(create_code(create_huff_tree(freqlist)),
+                             create_code(create_huff_tree_linear(freqlist)))
+        freqlist = [3] * 256
+        freqlist[7:200:3] = [1] * 65
+        self.assertEqual(create_code(create_huff_tree(freqlist)),
+                         create_code(create_huff_tree_linear(freqlist)))
+        self.assertIsNone(create_huff_tree_linear([0] * 256))
+        self.assertEqual('z', create_huff_tree_linear([0] * 122 + [4]).char)
+
+    def test_code_lengths_in_place(self):
+        """ Tests optimal lengths for an alphabet larger than 256"""
+        freqs = sorted((idx * 7919) % 1000 + 1 for idx in range(1000))
+        lengths = list(freqs)
+        code_lengths_in_place(lengths)
+        self.assertEqual(1.0, sum(2.0 ** -length for length in lengths))
+        freqlist = [0] * 256
+        freqlist[97:104] = [2, 4, 8, 16, 0, 2, 1]
+        tree_codes = create_code(create_huff_tree(freqlist))
+        weights = sorted(freq for freq in freqlist if freq)
+        code_lengths_in_place(weights)
+        self.assertEqual(sorted(len(code) for code in tree_codes if code),
+                         sorted(weights))
+
+class FlatTreeTests(ut.TestCase):
+    """ Tests the array-backed tree against the linked one"""
+
+    def test_same_tree(self):
+        """ Tests the flat builder, its codes and its node view"""
+        for name in ("file1.txt", "file2.txt", "file3.txt"):
+            freqlist = cnt_freq(name)
+            tree = create_flat_tree(freqlist)
+            self.assertEqual(create_huff_tree(freqlist), tree.to_node())
+            self.assertEqual(create_code(create_huff_tree(freqlist)),
+                             create_code(tree))
+            self.assertEqual(create_code(create_huff_tree(freqlist), True),
+                             create_code(tree, True))
+        self.assertEqual(0, len(create_flat_tree([0] * 256)))
+        self.assertIsNone(create_flat_tree([0] * 256).to_node())
+        self.assertEqual(HuffmanNode(4, 'z'),
+                         create_flat_tree([0] * 122 + [4]).to_node())
+
+    def test_add(self):
+        """ Tests building a tree by hand"""
+        tree = FlatHuffmanTree()
+        leaf_a = tree.add(2, ord('a'))
+        leaf_b = tree.add(3, ord('b'))
+        root = tree.add(5, ord('a'), leaf_a, leaf_b)
+        self.assertEqual((0, 1, 2, 2), (leaf_a, leaf_b, root, tree.root))
+        self.assertTrue(tree.is_leaf(leaf_a))
+        self.assertFalse(tree.is_leaf(root))
+        self.assertEqual(['0', '1'], create_code(tree)[97:99])
+
+    def test_tree_walk_decode(self):
+        """ Tests the bit by bit decoder over the flat tree"""
+        with tempfile.TemporaryDirectory() as tmp:
+            huffman_encode("file2.txt", os.path.join(tmp, "enc.txt"))
+            huffman_decode(os.path.join(tmp, "enc_compressed.txt"),
+                           os.path.join(tmp, "dec.txt"), 0)
+            self.assertTrue(filecmp.cmp(os.path.join(tmp, "dec.txt"),
+                                        "file2.txt", shallow=False))
+
+class InMemoryTests(ut.TestCase):
+    """ Tests encoding and decoding buffers and file objects"""
+
+    def test_same_as_file(self):
+        """ Tests that encode_bytes matches the canonical file"""
+        with open("file2.txt", "rb") as file:
+            data = file.read()
+        with tempfile.TemporaryDirectory() as tmp:
+            huffman_canonical.canonical_encode("file2.txt",
+                                               os.path.join(tmp, "enc.huf"))
+            with open(os.path.join(tmp, "enc.huf"), "rb") as file:
+                expected = file.read()
+        self.assertEqual(expected, huffman_memory.encode_bytes(data))
+        self.assertEqual(expected,
+                         huffman_memory.encode_bytes(bytearray(data), 7))
+
+    def test_round_trip(self):
+        """ Tests decode_into on buffers of every kind"""
+        for data in (b'', b'a', b'\x00\xff' * 300, bytes(range(256)) * 9):
+            encoded = huffman_memory.encode_bytes(memoryview(data))
+            for buf in (encoded, bytearray(encoded), memoryview(encoded)):
+                out = bytearray(b'>')
+                self.assertEqual(len(data),
+                                 huffman_memory.decode_into(buf, out, 8, 5))
+                self.assertEqual(b'>' + data, out)
+        encoded = huffman_memory.encode_bytes(b'\x00\xff' * 300, 64, 12)
+        out = bytearray()
+        huffman_memory.decode_into(encoded, out)
+        self.assertEqual(b'\x00\xff' * 300, out)
+        with self.assertRaises(ValueError):
+            huffman_memory.decode_into(b'97 1\n', bytearray())
+        with self.assertRaises(ValueError):
+            huffman_memory.decode_into(encoded[:-20], bytearray())
+
+    def test_file_objects(self):
+        """ Tests the file object variants"""
+        data = b'prefix' + bytes(range(256)) * 5
+        source = io.BytesIO(data)
+        source.seek(6)
+        encoded = io.BytesIO()
+        huffman_memory.encode_fileobj(source, encoded, 100)
+        self.assertEqual(huffman_memory.encode_bytes(data[6:]),
+                         encoded.getvalue())
+        encoded.seek(0)
+        decoded = io.BytesIO()
+        self.assertEqual(len(data) - 6,
+                         huffman_memory.decode_fileobj(encoded, decoded))
+        self.assertEqual(data[6:], decoded.getvalue())
+        self.assertFalse(decoded.closed)
+
+    def test_stream_decoder(self):
+        """ Tests that pushing the data a byte at a time decodes every
+        format the same"""
+        data = b'abracadabra \x00' * 50
+        adaptive = io.BytesIO()
+        encoder = huffman_adaptive.AdaptiveEncoder(adaptive)
+        encoder.write(data)
+        encoder.close()
+        with open("file3_soln_compressed.txt", "rb") as file:
+            text_format = file.read()
+        with open("file3.txt", "rb") as file:
+            text = file.read()
+        for encoded, expected in ((huffman_memory.encode_bytes(data), data),
+                                  (adaptive.getvalue(), data),
+                                  (b'HUFS' + data, data),
+                                  (text_format, text)):
+            decoder = huffman_memory.StreamDecoder(8)
+            pieces = [decoder.feed(encoded[pos:pos + 1])
+                      for pos in range(len(encoded))]
+            self.assertEqual(expected, b''.join(pieces) + decoder.finish())
+        decoder = huffman_memory.StreamDecoder()
+        decoder.feed(adaptive.getvalue()[:-5])
+        with self.assertRaises(ValueError):
+            decoder.finish()
+
+class DecodeTableTests(ut.TestCase):
+    """ Tests the table-driven decoder"""
+
+    def test_matches_tree_walk(self):
+        """ Tests that both decoders agree for every table size"""
+        for bits in (0, 1, 2, 3, 8, 12):
+            huffman_decode("file2_soln_compressed.txt", "decodetest2.txt",
+                           bits)
+            self.assertTrue(filecmp.cmp("decodetest2.txt", "file2.txt"))
+
+    def test_secondary_tables(self):
+        """ Tests codes longer than the primary table"""
+        codes = create_code(create_huff_tree(cnt_freq("file3.txt")))
+        table = DecodeTable(codes, 2)
+        self.assertTrue(table.subtables)
+        text = encode_text("file3.txt", codes) + codes[0]
+        text += '0' * (-len(text) % 8)
+        data = int(text, 2).to_bytes(len(text) // 8, 'big')
+        with open("file3.txt") as file:
+            expected = file.read().encode('latin-1')
+        # split the input so codes straddle chunk boundaries
+        chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+        self.assertEqual(expected, b''.join(table.decode(chunks, eof=0)))
+        self.assertEqual(expected[:5],
+                         b''.join(table.decode([data], count=5)))
+
+    def test_deep_codes(self):
+        """ Tests that codes far longer than the table take small tables"""
+        freq_list = [0] * 256
+        freq_list[0] = 1
+        for idx in range(45):
+            freq_list[65 + idx] = 1 << idx
+        codes = create_code(create_huff_tree(freq_list))
+        self.assertEqual(45, max(len(code) for code in codes))
+        table = DecodeTable(codes)
+        self.assertLess(sum(1 << sub_bits
+                            for sub_bits, _, _ in table.subtables), 1 << 16)
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "deep_compressed.txt")
+            decoded = os.path.join(tmp, "deep.txt")
+            writer = HuffmanBitWriter(encoded)
+            writer.write_str(create_header(freq_list))
+            writer.write_str('\n')
+            for char in "ABCLMNOZab":
+                writer.write_code(codes[ord(char)])
+            writer.write_code(codes[0])
+            writer.close()
+            for bits in (0, 1, 3, 10):
+                huffman_decode(encoded, decoded, bits, cache=None)
+                with open(decoded) as file:
+                    self.assertEqual("ABCLMNOZab", file.read())
+
+    def test_truncated(self):
+        """ Tests that a bitstream missing its end is an error"""
+        codes = create_code(create_huff_tree(cnt_freq("file1.txt")))
+        table = DecodeTable(codes)
+        with self.assertRaises(ValueError):
+            list(table.decode([b'\x00'], eof=0))
+
+class CanonicalTests(ut.TestCase):
+    """ Tests the canonical code format"""
+
+    def setUp(self):
+        """ Creates a scratch directory for the written files"""
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """ Removes the scratch directory"""
+        self.tmp.cleanup()
+
+    def round_trip(self, in_file):
+        """ Encodes and decodes in_file, returns the compressed size"""
+        encoded = os.path.join(self.tmp.name, "canonical.huf")
+        decoded = os.path.join(self.tmp.name, "canonical.out")
+        huffman_canonical.canonical_encode(in_file, encoded, 5)
+        huffman_decode(encoded, decoded, chunk_size=3)
+        self.assertTrue(filecmp.cmp(in_file, decoded, shallow=False))
+        return os.path.getsize(encoded)
+
+    def write(self, data):
+        """ Writes data to a scratch file and returns its name"""
+        in_file = os.path.join(self.tmp.name, "data.bin")
+        with open(in_file, 'wb') as file:
+            file.write(data)
+        return in_file
+
+    def test_canonical_codes(self):
+        """ Tests codes derived from lengths only"""
+        lengths = [0] * 256
+        lengths[ord('a')] = 2
+        lengths[ord('b')] = 1
+        lengths[ord('c')] = 3
+        lengths[ord('d')] = 3
+        codes = huffman_canonical.canonical_codes(lengths)
+        self.assertEqual((0b0, 1), codes[ord('b')])
+        self.assertEqual((0b10, 2), codes[ord('a')])
+        self.assertEqual((0b110, 3), codes[ord('c')])
+        self.assertEqual((0b111, 3), codes[ord('d')])
+        lengths[ord('e')] = 1
+        with self.assertRaises(ValueError):
+            huffman_canonical.canonical_codes(lengths)
+
+    def test_round_trips(self):
+        """ Tests fixtures, empty, single symbol and dense inputs"""
+        for name in ("file1.txt", "file2.txt", "file3.txt"):
+            self.round_trip(name)
+        self.round_trip(self.write(b''))
+        self.round_trip(self.write(b'\x00' * 50))
+        self.round_trip(self.write(bytes(range(256)) * 2 + b'\x00' * 99))
+
+    def test_smaller_header(self):
+        """ Tests that the binary header beats the text header"""
+        self.assertLess(self.round_trip("file1.txt"),
+                        os.path.getsize("file1_soln_compressed.txt"))
+        self.assertFalse(huffman_canonical.is_canonical(
+            "file1_soln_compressed.txt"))
+
+    def test_length_limit(self):
+        """ Tests package-merge lengths on a Fibonacci distribution"""
+        fibonacci = [1, 1]
+        while len(fibonacci) < 30:
+            fibonacci.append(fibonacci[-1] + fibonacci[-2])
+        freq_list = fibonacci + [0] * 226
+        self.assertEqual(29, max(huffman_canonical.code_lengths(freq_list)))
+        lengths = huffman_canonical.code_lengths(freq_list, 8)
+        self.assertEqual(8, max(lengths))
+        self.assertEqual(1.0, sum(2.0 ** -length
+                                  for length in lengths if length))
+        # a limit the optimal code already meets changes nothing
+        self.assertEqual(huffman_canonical.code_lengths(freq_list),
+                         huffman_canonical.code_lengths(freq_list, 29))
+        with self.assertRaises(ValueError):
+            huffman_canonical.limited_code_lengths(freq_list, 4)
+
+    def test_limited_round_trip(self):
+        """ Tests that the limit is recorded and sizes the decode table"""
+        data = b''.join(bytes([sym]) * (sym + 1) ** 2 for sym in range(60))
+        in_file = self.write(data)
+        encoded = os.path.join(self.tmp.name, "limited.huf")
+        huffman_canonical.canonical_encode(in_file, encoded,
+                                           max_code_len=7)
+        reader = HuffmanBitReader(encoded)
+        header = huffman_canonical.read_header(reader)
+        reader.close()
+        self.assertEqual(7, header.max_code_len)
+        self.assertEqual(7, max(header.lengths))
+        self.assertEqual(7, header.table_bits(3))
+        decoded = os.path.join(self.tmp.name, "limited.out")
+        huffman_decode(encoded, decoded)
+        self.assertTrue(filecmp.cmp(in_file, decoded, shallow=False))
+
+    def test_iter_decode(self):
+        """ Tests that iter_decode recognizes canonical files"""
+        encoded = os.path.join(self.tmp.name, "canonical.huf")
+        huffman_canonical.canonical_encode("file3.txt", encoded)
+        with open("file3.txt") as file:
+            self.assertEqual(file.read(), ''.join(iter_decode(encoded)))
+
+class SeekIndexTests(ut.TestCase):
+    """ Tests random access through the seek index"""
+
+    def test_decode_range(self):
+        """ Tests slices around checkpoints with and without an index"""
+        with open("file3.txt", 'rb') as file:
+            data = file.read() * 20
+        with tempfile.TemporaryDirectory() as tmp:
+            in_file = os.path.join(tmp, "data.txt")
+            with open(in_file, 'wb') as file:
+                file.write(data)
+            plain = os.path.join(tmp, "plain.huf")
+            indexed = os.path.join(tmp, "indexed.huf")
+            huffman_canonical.canonical_encode(in_file, plain)
+            huffman_canonical.canonical_encode(in_file, indexed, 7, 5)
+            self.assertEqual(os.path.getsize(plain) + 8 * 124 + 1,
+                             os.path.getsize(indexed))
+            for start, length in ((0, 3), (4, 1), (5, 5), (37, 20),
+                                  (333, 100), (619, 1), (620, 1), (0, 999)):
+                for encoded in (plain, indexed):
+                    self.assertEqual(data[start:start + length],
+                                     huffman_canonical.decode_range(
+                                         encoded, start, length))
+            for encoded in (plain, indexed):
+                with self.assertRaises(ValueError):
+                    huffman_canonical.decode_range(encoded, -1, 5)
+            decoded = os.path.join(tmp, "decoded.txt")
+            huffman_decode(indexed, decoded)
+            self.assertTrue(filecmp.cmp(in_file, decoded, shallow=False))
+
+    def test_skip_bits(self):
+        """ Tests decoding a bitstream that starts inside a byte"""
+        codes = create_code(create_huff_tree(cnt_freq("file1.txt")))
+        table = DecodeTable(codes)
+        # 'd' is 0 and 'c' is 10: 101 followed by dcd and padding
+        data = bytes([0b10101000])
+        self.assertEqual(b'dcd', b''.join(table.decode([data], 3, skip=3)))
+
+class ParallelTests(ut.TestCase):
+    """ Tests the block-parallel container"""
+
+    def test_round_trips(self):
+        """ Tests process pools and inline runs with many blocks"""
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "parallel.huf")
+            decoded = os.path.join(tmp, "parallel.out")
+            for workers in (1, 2):
+                huffman_parallel.huffman_encode_parallel(
+                    "file3.txt", encoded, 7, workers)
+                huffman_parallel.huffman_decode_parallel(
+                    encoded, decoded, workers)
+                self.assertTrue(filecmp.cmp("file3.txt", decoded,
+                                            shallow=False))
+            huffman_decode(encoded, "decodetest3.txt")
+            self.assertTrue(filecmp.cmp("decodetest3.txt", "file3.txt"))
+
+    def test_block_table(self):
+        """ Tests that blocks are laid out back to back"""
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "parallel.huf")
+            huffman_parallel.huffman_encode_parallel("file1.txt", encoded,
+                                                     10, 1)
+            count, block_size, _, blocks = \
+                huffman_parallel.read_container(encoded)
+            self.assertEqual((32, 10, 4), (count, block_size, len(blocks)))
+            for (offset, size, _), (next_offset, _, _) in zip(blocks,
+                                                               blocks[1:]):
+                self.assertEqual(offset + size, next_offset)
+            self.assertEqual(os.path.getsize(encoded),
+                             blocks[-1][0] + blocks[-1][1])
+
+    def test_stored_blocks(self):
+        """ Tests that blocks coding cannot shrink are stored raw"""
+        rand = random.Random(202)
+        data = (b"abracadabra " * 400)[:4096] + bytes(
+            rand.getrandbits(8) for _ in range(4096)) + b"ab" * 100
+        with tempfile.TemporaryDirectory() as tmp:
+            raw = os.path.join(tmp, "mixed.bin")
+            encoded = os.path.join(tmp, "mixed.huf")
+            decoded = os.path.join(tmp, "mixed.out")
+            with open(raw, "wb") as file:
+                file.write(data)
+            for workers in (1, 2):
+                huffman_parallel.huffman_encode_parallel(raw, encoded, 4096,
+                                                         workers)
+                _, _, _, blocks = huffman_parallel.read_container(encoded)
+                self.assertEqual([False, True, False],
+                                 [stored for _, _, stored in blocks])
+                self.assertEqual(4096, blocks[1][1])
+                huffman_parallel.huffman_decode_parallel(encoded, decoded,
+                                                         workers)
+                self.assertTrue(filecmp.cmp(raw, decoded, shallow=False))
+            huffman_decode(encoded, decoded, binary=True)
+            self.assertTrue(filecmp.cmp(raw, decoded, shallow=False))
+
+    def test_many_files(self):
+        """ Tests batches with small files grouped and failing files"""
+        names = ["file0.txt", "file1.txt", "missing.txt", "file2.txt",
+                 "file3.txt"]
+        with tempfile.TemporaryDirectory() as tmp:
+            bad = os.path.join(tmp, "bad.txt.huf")
+            with open(bad, "wb") as file:
+                file.write(b"HUFC\x00")
+            for workers in (1, 2):
+                results = huffman_parallel.huffman_encode_many(
+                    names + ["file1.txt"], tmp, workers, 40)
+                self.assertEqual(names + ["file1.txt"],
+                                 [result.path for result in results])
+                self.assertEqual([False, False, True, False, False, True],
+                                 [result.error is not None
+                                  for result in results])
+                encoded = [result.output for result in results
+                           if result.error is None]
+                results = huffman_parallel.huffman_decode_many(
+                    encoded + [bad], os.path.join(tmp, "out"), workers)
+                self.assertIn("ValueError", results[-1].error)
+                for name, result in zip(["file0.txt", "file1.txt",
+                                         "file2.txt", "file3.txt"], results):
+                    self.assertIsNone(result.error)
+                    self.assertEqual(os.path.join(tmp, "out", name),
+                                     result.output)
+                    self.assertTrue(filecmp.cmp(name, result.output,
+                                                shallow=False))
+
+class BinaryCountTests(ut.TestCase):
+    """ Tests the block-wise byte counting"""
+
+    def test_histogram_backends(self):
+        """ Tests that NumPy and the fallback count the same"""
+        blocks = [b'abracadabra', bytes(range(256)), b'', b'\xff' * 9]
+        numpy = huffman_freq.numpy
+        try:
+            huffman_freq.numpy = None
+            fallback = huffman_freq.byte_histogram(blocks)
+        finally:
+            huffman_freq.numpy = numpy
+        self.assertEqual(fallback, huffman_freq.byte_histogram(blocks))
+        self.assertEqual(6, fallback[ord('a')])
+        self.assertEqual(10, fallback[255])
+        self.assertEqual(1, fallback[0])
+
+    def test_binary_cnt_freq(self):
+        """ Tests that binary counting matches text counting on ASCII"""
+        self.assertEqual(cnt_freq("file3.txt"),
+                         cnt_freq("file3.txt", 5, binary=True))
+
+    def test_binary_round_trip(self):
+        """ Tests encoding and decoding bytes that are not ASCII"""
+        data = bytes(range(1, 256)) * 3 + b'\xc3\xa9t\xc3\xa9\r\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            in_file = os.path.join(tmp, "data.bin")
+            with open(in_file, 'wb') as file:
+                file.write(data)
+            out_file = os.path.join(tmp, "data.txt")
+            huffman_encode(in_file, out_file, binary=True)
+            decoded = os.path.join(tmp, "decoded.bin")
+            for bits in (0, 8):
+                huffman_decode(os.path.join(tmp, "data_compressed.txt"),
+                               decoded, bits, binary=True)
+                with open(decoded, 'rb') as file:
+                    self.assertEqual(data, file.read())
+
+    def test_binary_null_bytes(self):
+        """ Tests that null bytes are refused instead of ending the data"""
+        with tempfile.TemporaryDirectory() as tmp:
+            in_file = os.path.join(tmp, "data.bin")
+            with open(in_file, 'wb') as file:
+                file.write(b'abc\x00def' * 10)
+            with self.assertRaises(ValueError):
+                cnt_freq(in_file, binary=True)
+            with self.assertRaises(ValueError):
+                huffman_encode(in_file, os.path.join(tmp, "data.txt"),
+                               binary=True)
+            self.assertFalse(os.path.exists(os.path.join(
+                tmp, "data_compressed.txt")))
+            table = huffman_pretrained.train_table([in_file], 1)
+            self.assertEqual(b'abc\x00def', huffman_pretrained.decode_message(
+                huffman_pretrained.encode_message(b'abc\x00def', table),
+                {1: table}))
+
+class StreamingDecodeTests(ut.TestCase):
+    """ Tests the lazy decoder"""
+
+    def test_iter_decode(self):
+        """ Tests that the pieces are lazy and add up to the text"""
+        pieces = iter_decode("file3_soln_compressed.txt", 4)
+        first = next(pieces)
+        self.assertTrue(0 < len(first) < 32)
+        with open("file3.txt") as file:
+            self.assertEqual(file.read(), first + ''.join(pieces))
+
+    def test_iter_tree_decode(self):
+        """ Tests that the tree walk yields pieces of chunk_size"""
+        pieces = list(iter_tree_decode("file3_soln_compressed.txt", 8))
+        self.assertEqual([8, 8, 8, 7], [len(piece) for piece in pieces])
+        with open("file3.txt") as file:
+            self.assertEqual(file.read(), ''.join(pieces))
+        huffman_decode("file3_soln_compressed.txt", "decodetest3.txt", 0, 5)
+        self.assertTrue(filecmp.cmp("decodetest3.txt", "file3.txt"))
+
+    def test_small_chunks(self):
+        """ Tests decoding to file with a tiny read size"""
+        huffman_decode("file2_soln_compressed.txt", "decodetest2.txt",
+                       chunk_size=1)
+        self.assertTrue(filecmp.cmp("decodetest2.txt", "file2.txt"))
+
+class StreamingEncodeTests(ut.TestCase):
+    """ Tests the chunked encoder"""
+
+    def test_chunks_and_no_debug(self):
+        """ Tests that small chunks without a debug dump change nothing"""
+        huffman_encode("file3.txt", "encodetest3.txt")
+        with tempfile.TemporaryDirectory() as tmp:
+            out_file = os.path.join(tmp, "stream.txt")
+            huffman_encode("file3.txt", out_file, debug=False, chunk_size=7)
+            self.assertFalse(os.path.exists(out_file))
+            self.assertTrue(filecmp.cmp(
+                os.path.join(tmp, "stream_compressed.txt"),
+                "encodetest3_compressed.txt", shallow=False))
+            huffman_encode("file3.txt", out_file, chunk_size=7)
+            self.assertTrue(filecmp.cmp(out_file, "file3_soln.txt",
+                                        shallow=False))
+
+class AdaptiveTests(ut.TestCase):
+    """ Tests the single pass adaptive coder"""
+
+    def test_round_trip(self):
+        """ Tests files and in-memory streams of every size"""
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "enc.huf")
+            decoded = os.path.join(tmp, "dec.txt")
+            for name in ("file0.txt", "file2.txt", "file3.txt"):
+                huffman_adaptive.adaptive_encode(name, encoded, 5)
+                huffman_decode(encoded, decoded)
+                self.assertTrue(filecmp.cmp(decoded, name, shallow=False))
+        for data in (b'', b'\x00', b'ab' * 50, bytes(range(256)) * 3):
+            out = io.BytesIO()
+            encoder = huffman_adaptive.AdaptiveEncoder(out)
+            encoder.write(data)
+            encoder.close()
+            decoder = huffman_adaptive.AdaptiveDecoder(
+                io.BytesIO(out.getvalue()))
+            self.assertEqual(data[:7], decoder.read(7))
+            self.assertEqual(data[7:], decoder.read())
+            self.assertEqual(b'', decoder.read())
+
+    def test_sibling_property(self):
+        """ Tests that freqs never decrease with the order of the nodes"""
+        tree = huffman_adaptive.AdaptiveTree()
+        for sym in b'abracadabra, mississippi' * 3:
+            tree.update(sym)
+            nodes = tree.nodes[tree.nyt.order:]
+            self.assertEqual(sorted(node.freq for node in nodes),
+                             [node.freq for node in nodes])
+            for node in nodes:
+                if node.left is not None:
+                    self.assertEqual(node.freq,
+                                     node.left.freq + node.right.freq)
+
+    def test_output_before_end(self):
+        """ Tests that flushed symbols decode before the stream is closed"""
+        out = io.BytesIO()
+        encoder = huffman_adaptive.AdaptiveEncoder(out)
+        encoder.write(b'hello, hello')
+        encoder.flush()
+        decoder = huffman_adaptive.AdaptiveDecoder(io.BytesIO(out.getvalue()))
+        self.assertEqual(b'hello, hel', decoder.read(10))
+        with self.assertRaises(ValueError):
+            decoder.read()
+        with self.assertRaises(ValueError):
+            huffman_adaptive.AdaptiveDecoder(io.BytesIO(b'HUF'))
+
+class PretrainedTests(ut.TestCase):
+    """ Tests messages encoded with a shared trained table"""
+
+    def setUp(self):
+        self.table = huffman_pretrained.train_table(
+            ["file1.txt", "file2.txt", "file3.txt"], 5)
+
+    def test_round_trip(self):
+        """ Tests messages of seen and unseen bytes"""
+        tables = {5: self.table}
+        for data in (b'', b'ddd cc', b'\xff\x00\x80 zzz', bytes(range(256))):
+            encoded = huffman_pretrained.encode_message(data, self.table)
+            self.assertEqual(5, encoded[0])
+            self.assertEqual(data,
+                             huffman_pretrained.decode_message(encoded,
+                                                               tables))
+        message = b'dddddd cccc bbb aa'
+        self.assertLess(len(huffman_pretrained.encode_message(message,
+                                                              self.table)),
+                        len(huffman_memory.encode_bytes(message)))
+        self.assertLessEqual(max(self.table.lengths), 15)
+        with self.assertRaises(ValueError):
+            huffman_pretrained.decode_message(b'\x06\x00', tables)
+        with self.assertRaises(ValueError):
+            huffman_pretrained.decode_message(encoded[:-1], tables)
+
+    def test_save_load(self):
+        """ Tests that a saved table decodes the same messages"""
+        with tempfile.TemporaryDirectory() as tmp:
+            name = os.path.join(tmp, "table.huft")
+            huffman_pretrained.save_table(self.table, name)
+            loaded = huffman_pretrained.load_table(name, 6)
+            with open(name, "r+b") as file:
+                file.truncate(100)
+            with self.assertRaises(ValueError):
+                huffman_pretrained.load_table(name)
+        self.assertEqual((5, self.table.lengths),
+                         (loaded.table_id, loaded.lengths))
+        encoded = huffman_pretrained.encode_message(b'\x01abc', self.table)
+        self.assertEqual(b'\x01abc', huffman_pretrained.decode_message(
+            encoded, {5: loaded}))
+
+class CodeCacheTests(ut.TestCase):
+    """ Tests the LRU cache of code tables"""
+
+    def test_lru(self):
+        """ Tests the counters and the eviction order"""
+        cache = LRUCache(2)
+        self.assertEqual(1, cache.get('a', lambda: 1))
+        self.assertEqual(2, cache.get('b', lambda: 2))
+        self.assertEqual(1, cache.get('a', lambda: 10))
+        self.assertEqual(3, cache.get('c', lambda: 3))
+        self.assertEqual(20, cache.get('b', lambda: 20))
+        self.assertEqual({'hits': 1, 'misses': 4, 'evictions': 2, 'size': 2,
+                          'maxsize': 2}, cache.stats())
+        cache.clear()
+        self.assertEqual((0, 0), (len(cache), cache.hits))
+        disabled = LRUCache(0)
+        disabled.get('a', lambda: 1)
+        self.assertEqual((0, 1), (len(disabled), disabled.misses))
+
+    def test_encode_decode(self):
+        """ Tests that the decoder reuses the tables of the encoder"""
+        cache = LRUCache(4)
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "enc.txt")
+            decoded = os.path.join(tmp, "dec.txt")
+            huffman_encode("file3.txt", encoded, cache=cache)
+            self.assertEqual((0, 1), (cache.hits, cache.misses))
+            huffman_decode(os.path.join(tmp, "enc_compressed.txt"), decoded,
+                           cache=cache)
+            huffman_decode(os.path.join(tmp, "enc_compressed.txt"), decoded,
+                           table_bits=0, cache=cache)
+            self.assertEqual((2, 1), (cache.hits, cache.misses))
+            self.assertTrue(filecmp.cmp(decoded, "file3.txt", shallow=False))
+            huffman_encode("file3.txt", encoded, cache=None)
+            self.assertTrue(filecmp.cmp(encoded, "file3_soln.txt",
+                                        shallow=False))
+        self.assertEqual(1, len(cache))
+
+class AsyncStreamTests(ut.IsolatedAsyncioTestCase):
+    """ Tests the asyncio coders over local socket pairs"""
+
+    async def through(self, coder, data):
+        """ Sends data through coder over a socket pair, returns its output"""
+        left, right = socket.socketpair()
+        left_reader, left_writer = await asyncio.open_connection(sock=left)
+        right_reader, right_writer = await asyncio.open_connection(
+            sock=right)
+
+        async def feed():
+            left_writer.write(data)
+            await left_writer.drain()
+            left_writer.write_eof()
+
+        async def serve():
+            try:
+                return await coder(right_reader, right_writer)
+            finally:
+                right_writer.close()
+
+        try:
+            _, _, out = await asyncio.gather(feed(), serve(),
+                                             left_reader.read())
+        finally:
+            left_writer.close()
+        return out
+
+    async def test_round_trip(self):
+        """ Tests both encoders against the decoder"""
+        with open("file3.txt", "rb") as file:
+            data = file.read() * 40
+        for single_pass in (True, False):
+            encoded = await self.through(
+                lambda reader, writer: huffman_async.encode_stream(
+                    reader, writer, 1000, single_pass), data)
+            self.assertLess(len(encoded), len(data))
+            self.assertEqual(data, await self.through(
+                huffman_async.decode_stream, encoded))
+        self.assertEqual(b'', await self.through(
+            huffman_async.decode_stream,
+            await self.through(huffman_async.encode_stream, b'')))
+
+    async def test_existing_formats(self):
+        """ Tests decoding files of the other encoders"""
+        with open("file2_soln_compressed.txt", "rb") as file:
+            text_format = file.read()
+        with open("file2.txt", "rb") as file:
+            data = file.read()
+        self.assertEqual(data, await self.through(
+            huffman_async.decode_stream, text_format))
+        self.assertEqual(data, await self.through(
+            huffman_async.decode_stream, huffman_memory.encode_bytes(data)))
+        with self.assertRaises(ValueError):
+            await self.through(huffman_async.decode_stream,
+                               huffman_memory.encode_bytes(data)[:-2])
+
+    async def test_idle_clients(self):
+        """ Tests that decoders waiting for data hold no executor thread"""
+        with ThreadPoolExecutor(1) as executor:
+            sockets = [socket.socketpair() for _ in range(2)]
+            idle = []
+            for _, right in sockets:
+                reader, writer = await asyncio.open_connection(sock=right)
+                idle.append((asyncio.ensure_future(huffman_async.decode_stream(
+                    reader, writer, executor=executor)), writer))
+            await asyncio.sleep(0.05)
+            try:
+                with open("file3.txt", "rb") as file:
+                    data = file.read()
+                encoded = await asyncio.wait_for(self.through(
+                    lambda reader, writer: huffman_async.encode_stream(
+                        reader, writer, executor=executor), data), 5)
+                self.assertEqual(data, await self.through(
+                    huffman_async.decode_stream, encoded))
+            finally:
+                for task, writer in idle:
+                    task.cancel()
+                    writer.close()
+                for left, _ in sockets:
+                    left.close()
+
+class StatsTests(ut.TestCase):
+    """ Tests the instrumentation of the encoder and decoder"""
+
+    def test_encode_decode(self):
+        """ Tests the stages and sizes reported"""
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "enc.txt")
+            compressed = os.path.join(tmp, "enc_compressed.txt")
+            decoded = os.path.join(tmp, "dec.txt")
+            stats = Stats()
+            huffman_encode("file2.txt", encoded, cache=None, stats=stats)
+            self.assertEqual(['count', 'tree', 'code', 'read', 'pack',
+                              'debug', 'close'], list(stats.stages))
+            self.assertEqual(('encode', 13, 13, 1, None),
+                             (stats.operation, stats.bytes_in, stats.symbols,
+                              stats.flushes, stats.cache_hit))
+            self.assertEqual(os.path.getsize(compressed), stats.bytes_out)
+            self.assertEqual(4, stats.tree_depth)
+            cache = LRUCache()
+            for table_bits, stages in ((8, ['header', 'tree', 'code',
+                                            'table', 'decode', 'write']),
+                                       (0, ['header', 'decode', 'write'])):
+                stats = Stats()
+                huffman_decode(compressed, decoded, table_bits, cache=cache,
+                               stats=stats)
+                self.assertEqual(stages, list(stats.stages))
+                self.assertEqual((13, 13, 4), (stats.symbols,
+                                               stats.bytes_out,
+                                               stats.tree_depth))
+                self.assertEqual(table_bits == 0, stats.cache_hit)
+            record = json.loads(stats.to_json())
+            self.assertEqual(stats.as_dict(), record)
+            self.assertAlmostEqual(
+                8 * (record['bytes_in'] - record['header_bytes']) / 13,
+                record['bits_per_symbol'])
+            self.assertAlmostEqual(sum(stats.stages.values()),
+                                   record['seconds'])
+
+class MemoryProfileTests(ut.TestCase):
+    """ Tests the peak memory tracking and budgets"""
+
+    def test_nested_stages(self):
+        """ Tests that an outer stage is charged the peak of inner ones"""
+        with MemoryStats() as stats:
+            with stats.stage('outer'):
+                with stats.stage('inner'):
+                    data = bytearray(1 << 20)
+                del data
+            with stats.stage('after'):
+                pass
+        self.assertGreaterEqual(stats.peaks['inner'], 1 << 20)
+        self.assertGreaterEqual(stats.peaks['outer'], stats.peaks['inner'])
+        self.assertLess(stats.peaks['after'], 1 << 20)
+        self.assertEqual(stats.peak, max(stats.peaks.values()))
+
+    def test_profile_and_budget(self):
+        """ Tests the record of a case and the budget check"""
+        record = huffman_memprof.profile_case('decode_tree', 4096)
+        self.assertEqual(['header', 'tree', 'code', 'decode', 'write'],
+                         list(record['peaks']))
+        self.assertEqual(4096, record['symbols'])
+        self.assertAlmostEqual(record['peak'] / 4096, record['ratio'])
+        self.assertEqual([], huffman_memprof.over_budget(
+            [record], {'decode_tree': record['ratio'] + 1}))
+        self.assertEqual([record], huffman_memprof.over_budget(
+            [record], {'decode_tree': record['ratio'] / 2}))
+        self.assertEqual([], huffman_memprof.over_budget(
+            [record], {'encode': 0.0}))
+
+class StoredTests(ut.TestCase):
+    """ Tests the size estimates and the stored fallback"""
+
+    def test_estimates(self):
+        """ Tests that the estimate is the size of the encoded file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "enc.txt")
+            for name in ("file1.txt", "file2.txt", "file3.txt"):
+                freq_list = cnt_freq(name)
+                int_codes = create_code(create_huff_tree(freq_list), True)
+                header_bytes = len(create_header(freq_list)) + 1
+                huffman_encode(name, encoded, False)
+                size = os.path.getsize(os.path.join(tmp,
+                                                    "enc_compressed.txt"))
+                self.assertEqual(size, huffman_stored.coded_size(
+                    header_bytes,
+                    huffman_stored.coded_bits(freq_list, int_codes)))
+                self.assertLessEqual(huffman_stored.coded_size(
+                    header_bytes, huffman_stored.entropy_bits(freq_list)),
+                                     size)
+        self.assertEqual(32, huffman_stored.entropy_bits([4, 4, 4, 4]))
+
+    def test_huffman_encode(self):
+        """ Tests that only files coding cannot shrink are stored"""
+        with tempfile.TemporaryDirectory() as tmp:
+            encoded = os.path.join(tmp, "enc.txt")
+            compressed = os.path.join(tmp, "enc_compressed.txt")
+            decoded = os.path.join(tmp, "dec.txt")
+            stats = Stats()
+            huffman_encode("file2.txt", encoded, stats=stats,
+                           allow_stored=True)
+            self.assertTrue(huffman_stored.is_stored(compressed))
+            self.assertFalse(os.path.exists(encoded))
+            self.assertEqual(['count', 'read', 'store'], list(stats.stages))
+            self.assertEqual((13, 17, 4), (stats.bytes_in, stats.bytes_out,
+                                           stats.header_bytes))
+            huffman_decode(compressed, decoded)
+            self.assertTrue(filecmp.cmp("file2.txt", decoded, shallow=False))
+
+            text = os.path.join(tmp, "text.txt")
+            with open(text, "w") as file:
+                file.write("abracadabra " * 100)
+            huffman_encode(text, encoded, False, allow_stored=True)
+            self.assertFalse(huffman_stored.is_stored(compressed))
+            self.assertLess(os.path.getsize(compressed), 1200)
+
+            # stored text keeps the bytes on disk, not one per character
+            with open(text, "w", encoding="utf-8") as file:
+                file.write("déjà vu, naïve café")
+            huffman_encode(text, encoded, False, stats=stats,
+                           allow_stored=True)
+            self.assertTrue(huffman_stored.is_stored(compressed))
+            self.assertEqual((23, 19), (stats.bytes_in, stats.symbols))
+            huffman_decode(compressed, decoded)
+            self.assertTrue(filecmp.cmp(text, decoded, shallow=False))
+
+    def test_canonical_encode(self):
+        """ Tests storing random bytes and reading them back"""
+        rand = random.Random(202)
+        data = bytes(rand.getrandbits(8) for _ in range(5000))
+        with tempfile.TemporaryDirectory() as tmp:
+            raw = os.path.join(tmp, "raw.bin")
+            encoded = os.path.join(tmp, "raw.huf")
+            decoded = os.path.join(tmp, "raw.out")
+            with open(raw, "wb") as file:
+                file.write(data)
+            huffman_canonical.canonical_encode(raw, encoded, 700,
+                                               allow_stored=True)
+            self.assertEqual(len(data) + 4, os.path.getsize(encoded))
+            huffman_decode(encoded, decoded, binary=True)
+            self.assertTrue(filecmp.cmp(raw, decoded, shallow=False))
+            self.assertEqual(data[4990:], huffman_canonical.decode_range(
+                encoded, 4990, 100))
+            out = io.BytesIO()
+            with open(encoded, "rb") as file:
+                self.assertEqual(len(data), huffman_memory.decode_fileobj(
+                    file, out))
+            self.assertEqual(data, out.getvalue())
+            huffman_canonical.canonical_encode(raw, encoded)
+            self.assertFalse(huffman_stored.is_stored(encoded))
+
+class BenchTests(ut.TestCase):
+    """ Tests the helpers of the benchmark suite"""
+
+    def test_corpus_and_sizes(self):
+        """ Tests the corpus profiles and size suffixes"""
+        self.assertEqual([4096, 65536, 3 << 30], [
+            huffman_bench.parse_size(text) for text in ('4096', '64k', '3G')])
+        with tempfile.TemporaryDirectory() as tmp:
+            name = os.path.join(tmp, "corpus.txt")
+            distinct = []
+            for profile in huffman_bench.PROFILES:
+                huffman_bench.make_corpus(name, 5000, profile=profile)
+                self.assertEqual(5000, os.path.getsize(name))
+                distinct.append(sum(1 for freq in cnt_freq(name) if freq))
+            self.assertEqual(2, distinct[2])
+            self.assertGreater(distinct[0], distinct[1])
+
+    def test_compare(self):
+        """ Tests that slower cases are flagged"""
+        old = [huffman_bench.make_record('b', case, [1.0], 10, 'B')
+               for case in ('same', 'slower', 'gone')]
+        new = [huffman_bench.make_record('b', 'same', [1.05], 10, 'B'),
+               huffman_bench.make_record('b', 'slower', [2.0], 10, 'B'),
+               huffman_bench.make_record('b', 'new', [1.0], 10, 'B')]
+        result = huffman_bench.compare(new, old, 0.1)
+        self.assertEqual([('same', False), ('slower', True)],
+                         [(record['case'], slower)
+                          for record, _, slower in result])
+        self.assertEqual(0.5, result[1][1])
+
+    def test_stage_sample(self):
+        """ Tests that the slow stages run on a sample of large corpora"""
+        sample_size = huffman_bench.SAMPLE_SIZE
+        huffman_bench.SAMPLE_SIZE = 1000
+        try:
+            records = huffman_bench.bench_stages(3000, repeat=1, n_calls=1)
+        finally:
+            huffman_bench.SAMPLE_SIZE = sample_size
+        by_case = {record['case']: record for record in records}
+        for case in ('encode_text', 'write_code'):
+            self.assertEqual((3000, 1000, 1000), (
+                by_case[case]['size'], by_case[case]['sample'],
+                by_case[case]['units']))
+        self.assertEqual((None, 3000), (by_case['cnt_freq']['sample'],
+                                        by_case['cnt_freq']['units']))
+
+class MmapTests(ut.TestCase):
+    """ Tests reading inputs through memory maps"""
+
+    def test_map_chunks(self):
+        """ Tests the pieces of a mapped file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            name = os.path.join(tmp, "data.bin")
+            with open(name, "wb") as file:
+                file.write(bytes(range(10)))
+            self.assertEqual([b'\x03\x04\x05\x06', b'\x07\x08\x09'],
+                             [bytes(piece)
+                              for piece in map_chunks(name, 4, 3)])
+            self.assertEqual([], list(map_chunks(name, 4, 10)))
+            open(name, "wb").close()
+            self.assertEqual([], list(map_chunks(name)))
+
+    def test_encode_decode(self):
+        """ Tests that mapped inputs give the same files"""
+        self.assertEqual(cnt_freq("file2.txt", binary=True),
+                         cnt_freq("file2.txt", 5, True, True))
+        codes = create_code(create_huff_tree(cnt_freq("file1.txt")))
+        self.assertEqual(encode_text("file1.txt", codes),
+                         encode_text("file1.txt", codes, True, True))
+        with tempfile.TemporaryDirectory() as tmp:
+            plain = os.path.join(tmp, "plain.txt")
+            mapped = os.path.join(tmp, "mapped.txt")
+            huffman_encode("file2.txt", plain, binary=True)
+            huffman_encode("file2.txt", mapped, chunk_size=3, binary=True,
+                           use_mmap=True)
+            self.assertTrue(filecmp.cmp(plain, mapped, shallow=False))
+            huffman_decode(os.path.join(tmp, "mapped_compressed.txt"),
+                           mapped, chunk_size=3, binary=True, use_mmap=True)
+            self.assertTrue(filecmp.cmp(mapped, "file2.txt", shallow=False))
+
+            encoded = os.path.join(tmp, "canonical.huf")
+            huffman_canonical.canonical_encode("file3.txt", encoded)
+            huffman_decode(encoded, mapped, chunk_size=5, use_mmap=True)
+            self.assertTrue(filecmp.cmp(mapped, "file3.txt", shallow=False))
+
+    def test_text_refused(self):
+        """ Tests that a memory map is not silently read as raw bytes"""
+        codes = create_code(create_huff_tree(cnt_freq("file1.txt")))
+        with self.assertRaises(ValueError):
+            read_chunks("file1.txt", use_mmap=True)
+        with self.assertRaises(ValueError):
+            cnt_freq("file1.txt", use_mmap=True)
+        with self.assertRaises(ValueError):
+            encode_text("file1.txt", codes, use_mmap=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                huffman_encode("file1.txt", os.path.join(tmp, "out.txt"),
+                               use_mmap=True)
+            self.assertEqual([], os.listdir(tmp))
+
+class HuffmanBitReaderTests(ut.TestCase):
+    """ Tests the buffered bit reader"""
+
+    def test_bulk_reads(self):
+        """ Tests peek_bits, skip_bits and read_bits across blocks"""
+        reader = HuffmanBitReader("file1_soln_compressed.txt", 3)
+        self.assertEqual(b"0 1 97 2 98 4 99 8 100 16 102 2 \n",
+                         reader.read_str())
+        self.assertEqual(0, reader.peek_bits(16))
+        reader.skip_bits(16)
+        self.assertEqual(0xAAAA, reader.read_bits(16))
+        self.assertEqual(0xDB, reader.read_byte())
+        self.assertFalse(reader.read_bit())
+        self.assertEqual(0b1101111, reader.read_bits(7))
+        self.assertEqual(0xFFBBC0, reader.peek_bits(24))
+        self.assertEqual(0xFFBBC000, reader.peek_bits(32))
+        reader.skip_bits(16)
+        self.assertEqual([0xC0], list(b''.join(reader.iter_bytes())))
+        with self.assertRaises(EOFError):
+            reader.read_bit()
+        reader.close()
+
+    def test_read_bit(self):
+        """ Tests that read_bit sees the bytes of the file in order"""
+        with open("file2_soln_compressed.txt", 'rb') as file:
+            data = file.read()
+        reader = HuffmanBitReader("file2_soln_compressed.txt", 5)
+        bits = [reader.read_bit() for _ in range(8 * len(data))]
+        reader.close()
+        expected = [(byte >> (7 - i)) & 1 == 1 for byte in data
+                    for i in range(8)]
+        self.assertEqual(expected, bits)
+
+class HuffmanBitWriterTests(ut.TestCase):
+    """ Tests the integer code bit writer"""
+
+    def setUp(self):
+        """ Creates a scratch directory for the written files"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bits_file = os.path.join(self.tmp.name, "bits.txt")
+
+    def tearDown(self):
+        """ Removes the scratch directory"""
+        self.tmp.cleanup()
+
+    def test_int_codes(self):
+        """ Tests that integer codes mirror the string codes"""
+        hufftree = create_huff_tree(cnt_freq("file3.txt"))
+        codes = create_code(hufftree)
+        int_codes = create_code(hufftree, as_int=True)
+        for code, (value, length) in zip(codes, int_codes):
+            self.assertEqual(len(code), length)
+            if code:
+                self.assertEqual(int(code, 2), value)
+
+    def test_write_bits(self):
+        """ Tests that all write methods pack the same bitstream"""
+        int_codes = create_code(create_huff_tree(cnt_freq("file3.txt")),
+                                as_int=True)
+        with open("file3.txt") as file:
+            data = file.read().encode('latin-1')
+        writer = HuffmanBitWriter(self.bits_file, 4)
+        writer.write_str("header\n")
+        writer.write_codes(data, int_codes)
+        writer.write_bits(*int_codes[0])
+        writer.close()
+        huffman_encode("file3.txt", "encodetest3.txt")
+        with open("encodetest3_compressed.txt", 'rb') as file:
+            expected = file.read().split(b'\n', 1)[1]
+        with open(self.bits_file, 'rb') as file:
+            self.assertEqual(b"header\n" + expected, file.read())
+
+    def test_vectorized_codes(self):
+        """ Tests that the NumPy packing and the Python loop agree"""
+        freq_list = [0] * 256
+        for sym, freq in enumerate((1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)):
+            freq_list[sym] = freq
+        freq_list[200] = 1000
+        int_codes = create_code(create_flat_tree(freq_list), as_int=True)
+        data = bytes((7 * idx) % 11 if idx % 3 else 200
+                     for idx in range(3 * huffman_pack.MIN_SYMBOLS))
+        outputs = []
+        for vectorize in (False, True):
+            out = io.BytesIO()
+            writer = HuffmanBitWriter(out, 16, vectorize)
+            writer.write_bits(0b101, 3)
+            writer.write_codes(data, int_codes)
+            writer.write_bits(1, 1)
+            writer.write_codes(memoryview(data)[5:], int_codes)
+            writer.close()
+            outputs.append(out.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+        numpy = huffman_pack.numpy
+        try:
+            huffman_pack.numpy = None
+            self.assertIsNone(huffman_pack.code_arrays(int_codes))
+        finally:
+            huffman_pack.numpy = numpy
+
+    def test_write_str_unaligned(self):
+        """ Tests that a string may only follow whole bytes"""
+        writer = HuffmanBitWriter(self.bits_file)
+        writer.write_code('101')
+        with self.assertRaises(ValueError):
+            writer.write_str("header")
+        writer.write_bits(0b11010, 5)
+        writer.write_str("!")
+        writer.close()
+        with open(self.bits_file, 'rb') as file:
+            self.assertEqual(b"\xba!", file.read())
+
 class ClassUseCaseTests(ut.TestCase):
     """ Test cases outlined in the lab manual"""
 
@@ -176,6 +1306,17 @@ class ClassUseCaseTests(ut.TestCase):
         self.assertEqual(0, pq_test.size())
         self.assertTrue(pq_test.is_empty())
 
+    def test_caller_list(self):
+        """ Tests that resizing leaves the list given to MinPQ its size"""
+        items = [5, 4, 3, 2, 1]
+        pq_test = MinPQ(items)
+        pq_test.insert(0)
+        pq_test.extend([9, 8, 7, 6])
+        self.assertEqual(5, len(items))
+        for expected in range(10):
+            self.assertEqual(expected, pq_test.del_min())
+        self.assertEqual(5, len(items))
+
 class MinPQSelfTests(ut.TestCase):
     """ Test cases to montitor the functionality of Min PQ"""
 
@@ -196,6 +1337,37 @@ class MinPQSelfTests(ut.TestCase):
         self.assertEqual(7, pq_test.del_min())
         self.assertTrue(pq_test.is_empty())
 
+    def test_odd_parent(self):
+        """ Tests sifting up from odd indices below the root's children"""
+        pq_test = MinPQ([0, 5, 1])
+        pq_test.insert(3)
+        self.assertEqual([0, 3, 1, 5, None, None], pq_test.arr)
+        self.assertEqual([0, 1, 3, 5], [pq_test.del_min() for _ in range(4)])
+
+    def test_bulk_operations(self):
+        """ Tests pushpop, replace and extend"""
+        pq_test = MinPQ()
+        self.assertEqual(5, pq_test.pushpop(5))
+        pq_test.extend([9, 4, 7, 1, 8])
+        self.assertEqual(8, pq_test.capacity)
+        self.assertEqual(0, pq_test.pushpop(0))
+        self.assertEqual(1, pq_test.pushpop(6))
+        self.assertEqual(4, pq_test.replace(10))
+        self.assertEqual([6, 7, 8, 9, 10],
+                         [pq_test.del_min() for _ in range(5)])
+        with self.assertRaises(IndexError):
+            pq_test.replace(1)
+        with self.assertRaises(IndexError):
+            pq_test.del_min()
+
+    def test_deep_heap(self):
+        """ Tests a heap far deeper than the recursion limit allows"""
+        pq_test = MinPQ(list(range(50000, 0, -1)))
+        for item in range(50001, 100000):
+            pq_test.insert(item)
+        self.assertEqual(list(range(1, 100000)),
+                         [pq_test.del_min() for _ in range(99999)])
+
     def test_repr(self):
         """ Tests the repr function"""
         pq_test = MinPQ()
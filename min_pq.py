@@ -67,6 +67,28 @@ class MinPQ:
         self.num_items += 1
         self.shift_up(self.num_items - 1)
 
+    def extend(self, items):
+        """ insert many items at once. The items are appended and the heap
+            order is restored with one heapify, which is O(n) instead of
+            O(k log n) for k single inserts.
+            Args:
+                items(iterable): the items to be inserted
+        """
+        items = list(items)
+        if not items:
+            return
+        needed = self.num_items + len(items)
+        capacity = max(self.capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        if capacity != self.capacity:
+            self.arr = self.arr[:self.num_items] + [None] * (
+                capacity - self.num_items)
+            self.capacity = capacity
+        self.arr[self.num_items:needed] = items
+        self.num_items = needed
+        self.heapify()
+
     def del_min(self):
         """ Pop the min valued item from the min heap
             Returns:
@@ -75,6 +97,8 @@ class MinPQ:
                 IndexError: Raises IndexError when the queue is empty
         """
 
+        if self.num_items == 0:
+            raise IndexError('del_min from an empty queue')
         min_item = self.arr[0]
         self.arr[0] = self.arr[self.num_items - 1]
         self.arr[self.num_items - 1] = None
@@ -83,6 +107,38 @@ class MinPQ:
         self.shrink()
         return min_item
 
+    def pushpop(self, item):
+        """ insert an item, then pop the min valued item. Faster than
+            insert followed by del_min.
+            Args:
+                item(any): the item to be inserted
+            Returns:
+                any: the minimum item of the queue with item inserted
+        """
+
+        if self.num_items and self.arr[0] < item:
+            item, self.arr[0] = self.arr[0], item
+            self.shift_down(0)
+        return item
+
+    def replace(self, item):
+        """ pop the min valued item, then insert an item. Faster than
+            del_min followed by insert.
+            Args:
+                item(any): the item to be inserted
+            Returns:
+                any: the minimum item of the queue before item was inserted
+            Raises:
+                IndexError: Raises IndexError when the queue is empty
+        """
+
+        if self.num_items == 0:
+            raise IndexError('replace on an empty queue')
+        min_item = self.arr[0]
+        self.arr[0] = item
+        self.shift_down(0)
+        return min_item
+
     def min(self):
         """ Returns the minimum item in the queue without deleting the item
             Returns:
@@ -91,6 +147,8 @@ class MinPQ:
                 IndexError: Raises IndexError when min queue is empty
         """
 
+        if self.num_items == 0:
+            raise IndexError('min of an empty queue')
         return self.arr[0]
 
     def is_empty(self):
@@ -112,66 +170,53 @@ class MinPQ:
         return self.num_items
 
     def shift_up(self, idx):
-        """ Shifts up an item in the queue using tail recursion
+        """ Shifts up an item in the queue
             Args:
                 idx(int): the index of the item to be shifted up in the array
         """
 
-        if idx == 1:
-            idx_parent = 0
-        else:
-            idx_parent = (idx - 2) // 2
-        if idx_parent < 0 or self.arr[idx_parent] < self.arr[idx]:
-            return
-        self.arr[idx], self.arr[idx_parent] = \
-            self.arr[idx_parent], self.arr[idx]
-        self.shift_up(idx_parent)
+        arr = self.arr
+        item = arr[idx]
+        while idx > 0:
+            idx_parent = (idx - 1) // 2
+            parent = arr[idx_parent]
+            if parent < item:
+                break
+            arr[idx] = parent
+            idx = idx_parent
+        arr[idx] = item
 
     def shift_down(self, idx):
         """ Shift down an item in the list to keep the min heap order
             Args:
                 idx (int): the index of the item to be shifted down in array
         """
-        if idx >= self.num_items - 1:
-            return
 
-        idx_left = 2 * idx + 1
-        idx_right = 2 * idx + 2
-
-        if idx_left > self.num_items - 1:
-            left_val = None
-        else:
-            left_val = self.arr[idx_left]
-        if idx_right > self.num_items - 1:
-            right_val = None
-        else:
-            right_val = self.arr[idx_right]
-
-        # Find the lowest value between the two children
-        if left_val is not None and right_val is not None and \
-                right_val < left_val:
-            idx_min = idx_right
-        elif left_val is not None:
-            idx_min = idx_left
-        else:
-            idx_min = None
-
-        if idx_min is None or idx_min < 0 or self.arr[idx] < self.arr[idx_min]:
-            return
-
-        self.arr[idx], self.arr[idx_min] = self.arr[idx_min], self.arr[idx]
-
-        self.shift_down(idx_min)
+        arr = self.arr
+        end = self.num_items
+        item = arr[idx]
+        idx_min = 2 * idx + 1
+        while idx_min < end:
+            # Find the lowest value between the two children
+            idx_right = idx_min + 1
+            if idx_right < end and arr[idx_right] < arr[idx_min]:
+                idx_min = idx_right
+            child = arr[idx_min]
+            if item < child:
+                break
+            arr[idx] = child
+            idx = idx_min
+            idx_min = 2 * idx + 1
+        arr[idx] = item
 
     def enlarge(self):
         """ Enlarges the array.
         """
         if self.num_items == self.capacity:
-            new_arr = [None] * (self.capacity * 2)
-            for i in range(self.num_items):
-                new_arr[i] = self.arr[i]
-            self.arr = new_arr
-            self.capacity = self.capacity * 2
+            new_cap = max(self.capacity * 2, 1)
+            # a new list, the one given to __init__ belongs to the caller
+            self.arr = self.arr + [None] * (new_cap - self.capacity)
+            self.capacity = new_cap
 
     def shrink(self):
         """ Shrinks the array.
@@ -180,8 +225,5 @@ class MinPQ:
         if self.capacity > 2 and \
                 (self.num_items and self.capacity >= self.num_items * 4):
             new_cap = self.capacity // 2
-            new_arr = [None] * new_cap
-            for i in range(self.num_items):
-                new_arr[i] = self.arr[i]
-            self.arr = new_arr
+            self.arr = self.arr[:new_cap]
             self.capacity = new_cap